@@ -0,0 +1,147 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Terminal colors (ANSI SGR escape sequences) for qtail --format=ansi
+#
+# Instead of translating to html (which is slow to insert and lays out
+# differently), cut the text into runs between escape sequences and
+# insert each run with its QTextCharFormat.  The current colors carry
+# over between reads, and so does an escape sequence split across them.
+# Escape sequences that aren't colors (cursor movement, titles, ...)
+# are thrown away.
+
+import re
+from functools import lru_cache
+
+from PyQt5.QtGui import QTextCharFormat, QColor, QFont
+
+# CSI params final, OSC up to BEL or ST, or a two character escape
+# (but not from the second ESC of a stray pair, ESC ESC b is a lone ESC then b)
+escapes = re.compile(r'\x1b(?:\[([0-?]*)[ -/]*([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|(?<!\x1b\x1b)[ -Z\\^-~])')
+# the start of one of those that could still be finished by the next read,
+# with a stray ESC before it so the next read sees the pair
+unfinished = re.compile(r'\x1b?\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?)?\Z')
+maxEscape = 256  # longer than this and it's not an escape sequence, just garbage
+
+# xterm's colors
+basicColors = [
+    '#000000', '#cd0000', '#00cd00', '#cdcd00', '#0000ee', '#cd00cd', '#00cdcd', '#e5e5e5',
+    '#7f7f7f', '#ff0000', '#00ff00', '#ffff00', '#5c5cff', '#ff00ff', '#00ffff', '#ffffff',
+]
+
+@lru_cache(maxsize=None)
+def color256(n):
+    if n<16: return QColor(basicColors[n])
+    if n<232:
+        n -= 16
+        levels = [0, 95, 135, 175, 215, 255]
+        return QColor(levels[n//36], levels[n//6%6], levels[n%6])
+    gray = 8+10*(n-232)
+    return QColor(gray, gray, gray)
+
+class ansiParser():
+    def __init__(self, foreground=None, background=None):
+        # defaults are needed for reverse video
+        self.foreground = foreground or QColor('black')
+        self.background = background or QColor('white')
+        self.formats = {}  # state: QTextCharFormat
+        self.reset()
+
+    def reset(self):
+        self.pending = ''  # incomplete escape sequence from the last read
+        self.fg = None     # None or QColor
+        self.bg = None
+        self.bold = self.italic = self.underline = self.strike = self.reverse = False
+
+    def state(self):
+        fg = self.fg.rgb() if self.fg else None
+        bg = self.bg.rgb() if self.bg else None
+        return (fg, bg, self.bold, self.italic, self.underline, self.strike, self.reverse)
+
+    def format(self):
+        key = self.state()
+        fmt = self.formats.get(key)
+        if fmt is not None: return fmt
+        fmt = QTextCharFormat()
+        (fg, bg) = (self.fg, self.bg)
+        if self.reverse:
+            (fg, bg) = (bg or self.background, fg or self.foreground)
+        if fg: fmt.setForeground(fg)
+        if bg: fmt.setBackground(bg)
+        if self.bold: fmt.setFontWeight(QFont.Bold)
+        if self.italic: fmt.setFontItalic(True)
+        if self.underline: fmt.setFontUnderline(True)
+        if self.strike: fmt.setFontStrikeOut(True)
+        self.formats[key] = fmt
+        return fmt
+
+    def sgr(self, params):
+        codes = [ int(p) if p.isdigit() else 0 for p in params.replace(':',';').split(';') ]
+        i = 0
+        while i<len(codes):
+            c = codes[i]
+            i += 1
+            if c==0:
+                self.fg = self.bg = None
+                self.bold = self.italic = self.underline = self.strike = self.reverse = False
+            elif c==1: self.bold = True
+            elif c==3: self.italic = True
+            elif c==4: self.underline = True
+            elif c==7: self.reverse = True
+            elif c==9: self.strike = True
+            elif c==22: self.bold = False
+            elif c==23: self.italic = False
+            elif c==24: self.underline = False
+            elif c==27: self.reverse = False
+            elif c==29: self.strike = False
+            elif 30<=c<=37: self.fg = color256(c-30)
+            elif 40<=c<=47: self.bg = color256(c-40)
+            elif 90<=c<=97: self.fg = color256(c-90+8)
+            elif 100<=c<=107: self.bg = color256(c-100+8)
+            elif c==39: self.fg = None
+            elif c==49: self.bg = None
+            elif c in (38, 48):
+                # 5;n for 256 colors or 2;r;g;b
+                color = None
+                if i+1<len(codes) and codes[i]==5:
+                    color = color256(min(codes[i+1], 255))
+                    i += 2
+                elif i+3<len(codes) and codes[i]==2:
+                    color = QColor(*[ min(v, 255) for v in codes[i+1:i+4] ])
+                    i += 4
+                else:
+                    break  # don't know how much to skip
+                if c==38: self.fg = color
+                else: self.bg = color
+            # else: blink, fonts, etc. aren't worth doing
+
+    def insert(self, cursor, text):
+        '''Insert text at cursor in color, returns the text without escapes'''
+        if self.pending:
+            text = self.pending + text
+            self.pending = ''
+        # hold back an escape sequence that isn't finished yet
+        m = unfinished.search(text, max(0, len(text)-maxEscape))
+        if m and '\n' not in m.group():
+            self.pending = m.group()
+            text = text[:m.start()]
+        if '\x1b' not in text:
+            # the usual case
+            if text: cursor.insertText(text, self.format())
+            return text
+        plain = []
+        last = 0
+        # ESCs that didn't start anything are dropped
+        for m in escapes.finditer(text):
+            run = text[last:m.start()].replace('\x1b', '')
+            if run:
+                cursor.insertText(run, self.format())
+                plain.append(run)
+            last = m.end()
+            if m.group(2)=='m':
+                self.sgr(m.group(1))
+        run = text[last:].replace('\x1b', '')
+        if run:
+            cursor.insertText(run, self.format())
+            plain.append(run)
+        return ''.join(plain)
@@ -0,0 +1,266 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Memory mapped line index for viewing huge files in qtail
+#
+# Instead of pushing a whole file through a QTextDocument, map the
+# file and keep a sparse index of where lines start.  The index is
+# built in a background thread, and only the requested window of
+# lines is ever decoded.  Memory use is one offset per stride lines.
+
+import os, mmap
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+
+from PyQt5.QtCore import QThread
+from PyQt5.Qt import pyqtSignal
+
+class lineIndex(QThread):
+    progress = pyqtSignal(int)  # number of lines indexed so far
+    def __init__(self, filename, stride=64, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.stride = max(1, stride)
+        self.fd = None
+        self.mm = None
+        self.open()
+
+    def open(self):
+        self.close()
+        self.fd = os.open(self.filename, os.O_RDONLY)
+        self.size = os.fstat(self.fd).st_size
+        # can't map an empty file, wait for it to grow
+        if self.size:
+            self.mm = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+        self.marks = array('Q', [0])  # offset of line 0, stride, 2*stride...
+        self.count = 0    # number of newlines seen
+        self.indexed = 0  # bytes scanned so far
+        self.tail = b''   # last byte indexed, to tell if the last line ended
+
+    def close(self):
+        if self.isRunning():
+            self.requestInterruption()
+            self.wait()
+        if self.mm:
+            self.mm.close()
+            self.mm = None
+        if self.fd!=None:
+            os.close(self.fd)
+            self.fd = None
+
+    def run(self):
+        chunk = 4*1024*1024  # SETTING?
+        stride = self.stride
+        while self.indexed < self.size and not self.isInterruptionRequested():
+            if self.shrunk(): break  # grow() will start over
+            pos = self.indexed
+            buf = self.mm[pos:pos+chunk]
+            if buf: self.tail = buf[-1:]
+            parts = buf.split(b'\n')
+            if len(parts)>1:
+                # start of every line after a newline in this chunk
+                starts = accumulate(map(len, parts[:-1]), lambda a,b: a+b+1, initial=pos)
+                # line numbers count+1 ... count+n start here, keep multiples of stride
+                first = (-(self.count+1)) % stride
+                self.marks.extend(islice(starts, first+1, None, stride))
+                self.count += len(parts)-1
+            self.indexed = pos+len(buf)
+            self.progress.emit(self.lines())
+        if not self.size:
+            self.progress.emit(0)
+
+    def grow(self):
+        '''Pick up new data appended to the file.  Returns false if the
+           file shrank or was replaced and the index had to be rebuilt.
+        '''
+        if self.fd==None: return True  # closed, the poll timer doesn't know
+        if self.shrunk():  # truncated in place, don't touch the old mapping
+            self.open()
+            self.start()
+            return False
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return True  # XX deleted? keep what we have
+        size = st.st_size
+        cur = os.fstat(self.fd)
+        replaced = (st.st_ino, st.st_dev)!=(cur.st_ino, cur.st_dev)
+        if size==self.size and not replaced:
+            return True
+        if size<self.size or replaced:  # truncated or rotated, start over
+            self.open()
+            self.start()
+            return False
+        if self.isRunning():
+            self.requestInterruption()
+            self.wait()
+        # only grew (shrinking was caught above), so the old mapping is safe to drop
+        if self.mm: self.mm.close()
+        self.size = size
+        self.mm = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+        self.start()
+        return True
+
+    def shrunk(self):
+        '''True if the file is now shorter than the mapping.  Reading a
+           mapping past the end of its file gets SIGBUS, so check this
+           before reading (it can still lose a race with a truncate, but
+           then the window is a few microseconds rather than a poll interval)
+        '''
+        if not self.mm: return False
+        try:
+            return os.fstat(self.fd).st_size<len(self.mm)
+        except OSError:
+            return True
+
+    def complete(self):
+        return self.indexed>=self.size
+
+    def lines(self):
+        # a trailing partial line counts as a line
+        if not self.size: return 0
+        if self.complete() and self.tail!=b'\n':
+            return self.count+1
+        return self.count
+
+    def offsetOf(self, line):
+        '''Byte offset of the start of line, or the end of the file'''
+        if line<=0 or not self.mm or self.shrunk(): return 0
+        m = line//self.stride
+        if m>=len(self.marks):
+            m = len(self.marks)-1
+        off = self.marks[m]
+        for i in range(line - m*self.stride):
+            off = self.mm.find(b'\n', off, self.size)
+            if off<0: return self.size
+            off += 1
+        return off
+
+    def lineAt(self, offset):
+        '''Line number containing byte offset (as far as it is indexed)'''
+        if not self.mm or offset<=0 or self.shrunk(): return 0
+        offset = min(offset, self.size)
+        m = bisect_right(self.marks, offset)-1
+        return m*self.stride + self.mm[self.marks[m]:offset].count(b'\n')
+
+    def around(self, offset, before, after):
+        '''Lines around the one starting at offset, without the index.
+           Returns (offset of the first, text, which line is the one at offset)
+        '''
+        if not self.mm or self.shrunk(): return (0, '', 0)
+        mm = self.mm
+        here = mm.rfind(b'\n', 0, offset)+1
+        start = here
+        row = 0
+        while row<before and start>0:
+            start = mm.rfind(b'\n', 0, start-1)+1
+            row += 1
+        end = here
+        for i in range(after):
+            end = mm.find(b'\n', end, self.size)
+            if end<0:
+                end = self.size
+                break
+            end += 1
+        return (start, mm[start:end].decode('utf-8', errors='backslashreplace'), row)
+
+    def text(self, start, count):
+        '''Decoded text of count lines starting at line start'''
+        if not self.mm or self.shrunk(): return ''
+        a = self.offsetOf(start)
+        b = self.offsetOf(start+count)
+        return self.mm[a:b].decode('utf-8', errors='backslashreplace')
+
+def tailOffset(fd, lines, maxbytes=None, block=64*1024):
+    '''Offset of the start of the last lines lines of an open file,
+       found by reading backwards from the end like tail(1) does.
+       Never goes back more than maxbytes if given.
+    '''
+    end = os.fstat(fd).st_size
+    limit = 0
+    if maxbytes: limit = max(0, end-maxbytes)
+    pos = end
+    # a newline at the very end finishes the last line, it doesn't start one
+    if end and os.pread(fd, 1, end-1)==b'\n':
+        pos -= 1
+    need = lines
+    while pos>limit:
+        size = min(block, pos-limit)
+        buf = os.pread(fd, size, pos-size)
+        n = buf.count(b'\n')
+        if n>=need:
+            # found enough, find the exact one
+            i = len(buf)
+            for _ in range(need):
+                i = buf.rindex(b'\n', 0, i)
+            return pos-size+i+1
+        need -= n
+        pos -= size
+        block = min(block*2, 4*1024*1024) # SETTING? read more each time
+    return limit
+
+def nextLine(fd, pos, block=64*1024):
+    '''Offset just past the first newline at or after pos, or None'''
+    while True:
+        data = os.pread(fd, block, pos)
+        if not data: return None
+        i = data.find(b'\n')
+        if i>=0: return pos+i+1
+        pos += len(data)
+
+def linesFrom(fd, pos, end, block=64*1024):
+    '''(offset, bytes) of each line of an open file that starts in [pos, end).
+       Only the first block of a very long line is returned.
+    '''
+    if pos>0:
+        # a line starts at pos only if there's a newline just before it
+        pos = nextLine(fd, pos-1, block)
+    while pos!=None and pos<end:
+        data = os.pread(fd, block, pos)
+        if not data: return
+        j = 0
+        while True:
+            i = data.find(b'\n', j)
+            if i<0: break
+            yield (pos+j, data[j:i])
+            j = i+1
+            if pos+j>=end: return
+        if len(data)<block:  # at the end of the file
+            if j<len(data): yield (pos+j, data[j:])
+            return
+        if j:
+            pos += j  # read the partial line again
+        else:
+            # longer than a block, that's plenty for a timestamp
+            yield (pos, data)
+            pos = nextLine(fd, pos+len(data), block)
+
+def timeOffset(fd, key, target, block=64*1024, limit=4*1024*1024):
+    '''Offset of the first line of an open file stamped at or after target,
+       by binary search like look(1).  key(line) gives the timestamp of a
+       line or None, and timestamps are assumed to be in order; unstamped
+       lines (tracebacks, etc.) go with the stamped line before them.
+       Each probe reads a block or so, so this is fast on any size file.
+       Returns the size of the file if every timestamp is earlier.
+    '''
+    size = os.fstat(fd).st_size
+    def first(pos, end, want=None):
+        for (off, line) in linesFrom(fd, pos, end, block):
+            k = key(line.decode('utf-8', errors='replace'))
+            if k!=None and (want==None or k>=want): return (off, k)
+        return None
+    (lo, hi, best) = (0, size, size)
+    while hi-lo>block:
+        mid = (lo+hi)//2
+        # XX a stretch of more than limit without timestamps counts as later
+        found = first(mid, min(hi, mid+limit))
+        if not found:
+            hi = mid
+        elif found[1]<target:
+            lo = found[0]+1
+        else:
+            (best, hi) = (found[0], found[0])
+    found = first(lo, hi, target)
+    if found: return found[0]
+    return best
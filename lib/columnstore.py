@@ -0,0 +1,245 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Table rows stored a column at a time
+#
+# A list of lists of str costs a list per row plus a str object per cell
+# (50 bytes or more, however short), so a big table takes many times the
+# size of its file.  Instead each column keeps its cells in the most
+# compact form that holds them:
+#   int, float  numbers that print back exactly as they were read: an array
+#               (a few odd ones like a header row or n/a are kept aside)
+#   dict        few distinct values (status, host...): a byte or two per
+#               cell, a code into a list of the values
+#   text        anything else: UTF-8 packed in one buffer with end offsets
+# A column starts as compact as its first batch allows and falls back a
+# step when something doesn't fit, so loading is a series of appends.
+# Missing cells (short rows) are ''.
+
+from array import array
+from itertools import accumulate, islice
+
+class column():
+    maxCodes = 65536  # distinct values a dict column can hold
+    def __init__(self, rows=0):
+        self.overrides = {}  # row -> value, for odd numbers and edited text
+        if rows:
+            # added after some rows were read, those are all missing
+            self.kind = 'dict'
+            self.values = ['']
+            self.lookup = {'':0}
+            self.data = array('B', bytes(rows))
+        else:
+            self.kind = None  # decided by the first batch
+            self.data = None
+
+    def __len__(self):
+        if self.kind=='text': return len(self.ends)
+        return len(self.data) if self.kind else 0
+
+    def extend(self, values):
+        if not self.kind:
+            for kind in ('int', 'float', 'dict'):
+                if self.start(kind, values): return
+        elif self.kind in ('int', 'float'):
+            slack = max(100, (len(self.data)+len(values))//100)
+            if self.numbers(values, slack): return
+            self.toDict()
+        if self.kind=='dict':
+            if self.codes(values): return
+            self.toText()
+        self.text(values)
+
+    def start(self, kind, values):
+        self.kind = kind
+        if kind in ('int', 'float'):
+            self.data = array('q' if kind=='int' else 'd')
+            # mostly numbers, anyway
+            if self.numbers(values, len(values)//2): return True
+        else:
+            self.values = []
+            self.lookup = {}
+            self.data = array('B')
+            if self.codes(values): return True
+            self.toText()
+            self.text(values)
+            return True
+        return False
+
+    def convert(self):
+        return (int, str) if self.kind=='int' else (float, repr)
+
+    def numbers(self, values, slack):
+        # only if it comes back out exactly as it went in (no 007 or 1.50),
+        # up to slack odd ones in all
+        (kind, back) = self.convert()
+        try:
+            n = list(map(kind, values))
+            if list(map(back, n))==values:
+                self.data.extend(array(self.data.typecode, n))  # all or nothing
+                return True
+        except (ValueError, OverflowError):
+            pass
+        # the slow way, one at a time
+        n = []
+        odd = {}
+        base = len(self.data)
+        for (i, v) in enumerate(values):
+            try:
+                x = kind(v)
+                if back(x)==v:
+                    n.append(x)
+                    continue
+            except (ValueError, OverflowError):
+                pass
+            odd[base+i] = v
+            n.append(0)
+            if len(odd)+len(self.overrides)>slack: return False
+        try:
+            self.data.extend(array(self.data.typecode, n))
+        except OverflowError:
+            return False
+        self.overrides.update(odd)
+        return True
+
+    def codes(self, values):
+        lookup = self.lookup
+        new = set(values).difference(lookup)
+        count = len(lookup)+len(new)
+        # not worth it for mostly unique values
+        if count>self.maxCodes or (count>1000 and count>(len(self.data)+len(values))//2):
+            return False
+        for v in new:
+            lookup[v] = len(self.values)
+            self.values.append(v)
+        if count>256 and self.data.typecode=='B':
+            self.data = array('H', self.data)
+        self.data.extend(map(lookup.__getitem__, values))
+        return True
+
+    def toDict(self):
+        old = list(map(self.convert()[1], self.data))
+        for (row, value) in self.overrides.items():
+            old[row] = value
+        self.overrides.clear()
+        self.start('dict', old)
+
+    def toText(self):
+        if self.kind=='dict':
+            old = list(map(self.values.__getitem__, self.data))
+            self.values = self.lookup = None
+        else:
+            old = []
+        self.kind = 'text'
+        self.data = bytearray()
+        self.ends = array('Q')
+        self.text(old)
+
+    def text(self, values):
+        b = [ v.encode('utf-8', errors='surrogatepass') for v in values ]
+        self.ends.extend(islice(accumulate(map(len, b), initial=len(self.data)), 1, None))
+        self.data += b''.join(b)
+
+    def get(self, row):
+        if row in self.overrides: return self.overrides[row]
+        k = self.kind
+        if k=='dict': return self.values[self.data[row]]
+        if k=='int': return str(self.data[row])
+        if k=='float': return repr(self.data[row])
+        start = self.ends[row-1] if row else 0
+        return self.data[start:self.ends[row]].decode('utf-8', errors='surrogatepass')
+
+    def set(self, row, value):
+        k = self.kind
+        if k in ('int', 'float'):
+            (kind, back) = self.convert()
+            try:
+                n = kind(value)
+                if back(n)==value:
+                    self.data[row] = n
+                    self.overrides.pop(row, None)
+                    return
+            except (ValueError, OverflowError):
+                pass
+            if row in self.overrides or len(self.overrides)<max(100, len(self.data)//100):
+                self.overrides[row] = value
+                return
+            self.toDict()
+            k = self.kind
+        if k=='dict':
+            code = self.lookup.get(value)
+            if code==None and len(self.values)<self.maxCodes:
+                code = self.lookup[value] = len(self.values)
+                self.values.append(value)
+                if code>=256 and self.data.typecode=='B':
+                    self.data = array('H', self.data)
+            if code!=None:
+                self.data[row] = code
+                self.overrides.pop(row, None)
+                return
+            self.toText()
+        self.overrides[row] = value
+
+    def memory(self):
+        size = self.data.buffer_info()[1]*self.data.itemsize if isinstance(self.data, array) else len(self.data)
+        if self.kind=='text': size += len(self.ends)*self.ends.itemsize
+        if self.kind=='dict': size += sum(map(len, self.values))+50*len(self.values)
+        return size
+
+class columnStore():
+    def __init__(self, rows=None):
+        self.columns = []
+        self.rows = 0
+        if rows: self.extend(rows)
+
+    def __len__(self):
+        return self.rows
+
+    def width(self):
+        return len(self.columns)
+
+    def extend(self, rows):
+        '''Append a batch of rows (lists of str), any length'''
+        if not rows: return
+        width = max(map(len, rows))
+        while len(self.columns)<width:
+            self.columns.append(column(self.rows))
+        width = len(self.columns)
+        if min(map(len, rows))<width:
+            rows = [ list(row)+['']*(width-len(row)) if len(row)<width else row for row in rows ]
+        for (col, values) in zip(self.columns, zip(*rows)):
+            col.extend(list(values))
+        self.rows += len(rows)
+
+    def prepend(self, rows):
+        '''Insert a batch of rows at the top, rebuilding every column'''
+        if not rows: return
+        (old, n) = (self.columns, self.rows)
+        width = max(len(old), max(map(len, rows)))
+        self.columns = []
+        self.rows = 0
+        self.extend([ list(row)+['']*(width-len(row)) for row in rows ])
+        for (i, col) in enumerate(self.columns):
+            col.extend([ old[i].get(r) for r in range(n) ] if i<len(old) else ['']*n)
+        self.rows += n
+
+    def cell(self, row, col):
+        return self.columns[col].get(row)
+
+    def setCell(self, row, col, value):
+        self.columns[col].set(row, value)
+
+    def row(self, row):
+        return [ col.get(row) for col in self.columns ]
+
+    def setRow(self, row, values):
+        for (i, col) in enumerate(self.columns):
+            col.set(row, values[i] if i<len(values) else '')
+
+    def addColumn(self, values):
+        col = column()
+        col.extend([ values[i] if i<len(values) else '' for i in range(self.rows) ])
+        self.columns.append(col)
+
+    def memory(self):
+        return sum(col.memory() for col in self.columns)
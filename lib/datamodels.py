@@ -114,10 +114,11 @@ class simpleTable(QAbstractTableModel):
         else:
             start=0
         self.beginInsertRows(QModelIndex(),start,start+count-1)
+        # in place, copying the whole table each batch is quadratic
         if where:
-            self.mydata = self.mydata+rows
+            self.mydata.extend(rows)
         else:
-            self.mydata = rows + self.mydata
+            self.mydata[0:0] = rows
         maxx = max([len(row) for row in rows])
         self.endInsertRows()
         self.checkExtendHeaders(maxx)
@@ -165,6 +166,58 @@ class simpleTable(QAbstractTableModel):
         self.dataChanged.emit(self.index(row,col), self.index(row,len(self.mydata[row])))
         return True
 
+class columnTable(simpleTable):
+    '''simpleTable kept in a columnStore (see lib/columnstore.py) instead
+       of a list of rows, for big tables of strings.  Adding rows at
+       the end is cheap, at the start rebuilds the columns.
+    '''
+    def __init__(self, store, headers):
+        super().__init__(store, headers)
+    def dataType(self, row, col):
+        return False
+    def data(self, index, role):
+        if role in [Qt.DisplayRole, Qt.UserRole, Qt.EditRole] and self.validateIndex(index):
+            if index.column()<self.mydata.width():
+                return self.mydata.cell(index.row(), index.column())
+        return None
+    def setData(self, index, value, role):
+        if not self.validateIndex(index) or index.column()>=self.mydata.width(): return False
+        if self.validator and role in [Qt.EditRole, Qt.CheckStateRole]:
+            if not self.validator(index,value): return False
+        self.mydata.setCell(index.row(), index.column(), str(value))
+        self.dataChanged.emit(index,index)
+        return True
+    def insertRowsAt(self, where, rows):
+        # where=0 at start, where=1 at end
+        if not rows: return
+        start = len(self.mydata) if where else 0
+        self.beginInsertRows(QModelIndex(),start,start+len(rows)-1)
+        if where:
+            self.mydata.extend(rows)
+        else:
+            self.mydata.prepend(rows)
+        self.endInsertRows()
+        self.checkExtendHeaders(self.mydata.width())
+    def appendRow(self, row):
+        self.insertRowsAt(1, [row])
+        return self.index(len(self.mydata)-1,0)
+    def appendColumn(self, head, coldata):
+        col = len(self.headers)
+        self.beginInsertColumns(QModelIndex(), col,col)
+        self.headers.append(head)
+        self.mydata.addColumn(coldata)
+        self.endInsertColumns()
+    def mergeCells(self, index, count=1):
+        row = index.row()
+        col = index.column()
+        cells = self.mydata.row(row)
+        if col+count>=len(cells): return False # whoops!
+        cells[col] = ' '.join(cells[col:col+count+1])
+        del cells[col+1:col+count+1]
+        self.mydata.setRow(row, cells)
+        self.dataChanged.emit(self.index(row,col), self.index(row,len(cells)))
+        return True
+
 class itemListModel(QAbstractTableModel):
     # an array of items, where each item is a row
     def __init__(self, headers):
@@ -228,9 +281,9 @@ class itemListModel(QAbstractTableModel):
             start=0
         self.beginInsertRows(QModelIndex(),start,start+count-1)
         if where:
-            self.data = self.data+rows
+            self.data.extend(rows)
         else:
-            self.data = rows + self.data
+            self.data[0:0] = rows
         self.endInsertRows()
 
     # subclass needs to first verify these can be deleted
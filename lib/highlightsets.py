@@ -0,0 +1,90 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Canned findall sets: named collections of regex + color
+#
+# All the patterns in a set are combined into one alternation of named
+# groups, so the document is scanned once no matter how many patterns
+# there are, and the group that matched picks the color.
+
+from PyQt5 import QtGui
+from PyQt5.QtCore import QSettings, QRegularExpression as QRE
+from PyQt5.QtGui import QColor, QTextCharFormat
+
+from lib.searchengine import whichGroup
+
+# sets are saved in their own QSettings group as lists of
+#   color [ic] pattern
+# where i means case insensitive
+settingsGroup = 'QTailHighlightSets'
+
+def listSets():
+    qs = QSettings()
+    qs.beginGroup(settingsGroup)
+    names = qs.childKeys()
+    qs.endGroup()
+    return sorted(names)
+
+def loadSet(name):
+    qs = QSettings()
+    qs.beginGroup(settingsGroup)
+    entries = qs.value(name, None)
+    qs.endGroup()
+    if not entries: return None
+    if type(entries)==str: entries = [entries] # QSettings unwraps single item lists
+    patterns = []
+    for e in entries:
+        try:
+            (color, flags, pattern) = e.split(' ', 2)
+        except ValueError:
+            print('Bad highlight entry in {}: {}'.format(name, e)) # EXCEPT
+            continue
+        patterns.append((pattern, color, 'i' in flags))
+    return highlightSet(name, patterns)
+
+def saveSet(hset):
+    qs = QSettings()
+    qs.beginGroup(settingsGroup)
+    qs.setValue(hset.name, [ '{} {} {}'.format(color, 'i' if nocase else 'c', pattern)
+                             for (pattern, color, nocase) in hset.patterns ])
+    qs.endGroup()
+
+def deleteSet(name):
+    qs = QSettings()
+    qs.beginGroup(settingsGroup)
+    qs.remove(name)
+    qs.endGroup()
+
+class highlightSet():
+    def __init__(self, name, patterns):
+        self.name = name
+        self.patterns = patterns # (regex, color, case insensitive)
+        self.names = [ 'h{}'.format(i) for i in range(len(patterns)) ]
+        self.tags = [ (name, i) for i in range(len(patterns)) ] # for the highlight store
+        self.formats = []
+        for (pattern, color, nocase) in patterns:
+            fmt = QTextCharFormat()
+            fmt.setBackground(QtGui.QBrush(QColor(color)))
+            self.formats.append(fmt)
+        self.compiled = self.regex()
+        self.mark = None      # end of what we've scanned
+
+    def regex(self):
+        alts = []
+        for (name, (pattern, color, nocase)) in zip(self.names, self.patterns):
+            if nocase: pattern = '(?i:' + pattern + ')'
+            alts.append('(?<{}>{})'.format(name, pattern))
+        return QRE('|'.join(alts), QRE.MultilineOption)
+
+    def isValid(self):
+        return bool(self.patterns) and self.compiled.isValid()
+
+    def scanText(self, text):
+        '''All hits in text as (pos, length, group), one pass for all patterns'''
+        hits = []
+        it = self.compiled.globalMatch(text)
+        while it.hasNext():
+            m = it.next()
+            if m.capturedLength()==0: continue # useless as a highlight
+            hits.append((m.capturedStart(), m.capturedLength(), whichGroup(m, self.names)))
+        return hits
@@ -0,0 +1,207 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# All the highlights in a qtail window
+#
+# QTextEdit extra selections are a flat list that has to be rebuilt to
+# change anything, and each one holds a cursor the document has to
+# update on every edit.  Instead keep every highlight as (start, length,
+# tag) in arrays sorted by start, and only hand the text edit extra
+# selections for what is actually on screen.
+# Positions are stored relative to an offset that follows trimming of
+# the top of the document (the same trick as the search dock model).
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from PyQt5.QtCore import QObject, QTimer, QPoint
+from PyQt5.QtGui import QTextCursor, QTextCharFormat
+from PyQt5.QtWidgets import QTextEdit
+
+class highlightStore(QObject):
+    def __init__(self, textedit):
+        super().__init__(textedit)
+        self.textedit = textedit
+        self.doc = textedit.document()
+        self.starts = array('q')
+        self.lens = array('l')
+        self.tags = []    # whose highlight this is, parallel to starts
+        self.formats = {} # tag: QTextCharFormat
+        self.offset = 0
+        self.maxlen = 0   # longest highlight, bounds covering searches
+        self.doc.contentsChange.connect(self.contentsChange)
+        # redraw once after a burst of changes
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.render)
+        textedit.verticalScrollBar().valueChanged.connect(self.schedule)
+        textedit.verticalScrollBar().rangeChanged.connect(self.schedule)
+        textedit.horizontalScrollBar().valueChanged.connect(self.schedule)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def schedule(self, *args):
+        if not self.timer.isActive(): self.timer.start(0)
+
+    def setFormat(self, tag, fmt):
+        if not isinstance(fmt, QTextCharFormat):
+            brush = fmt
+            fmt = QTextCharFormat()
+            fmt.setBackground(brush)
+        self.formats[tag] = fmt
+        self.schedule()
+
+    def add(self, starts, lens, tag):
+        '''Add highlights at document positions starts with lengths lens.
+           tag is either one tag for all of them or a list of tags.
+        '''
+        if not starts: return
+        if type(tag)!=list: tag = [tag]*len(starts)
+        off = self.offset
+        new = sorted(zip([ s-off for s in starts ], lens, tag), key=lambda e: e[0])
+        if self.starts:
+            # skip ones we already have, usually from rescanning a partial line
+            last = self.starts[-1]
+            new = [ e for e in new if e[0]>last or not self.has(*e) ]
+            if not new: return
+        (rel, lens, tag) = map(list, zip(*new))
+        self.maxlen = max(self.maxlen, max(lens))
+        if not self.starts or rel[0]>self.starts[-1]:
+            # the usual case: new text arriving at the end
+            self.starts.extend(rel)
+            self.lens.extend(lens)
+            self.tags.extend(tag)
+        else:
+            old = zip(self.starts, self.lens, self.tags)
+            merged = sorted(list(old)+new, key=lambda e: e[0])
+            self.starts = array('q', [ e[0] for e in merged ])
+            self.lens = array('l', [ e[1] for e in merged ])
+            self.tags = [ e[2] for e in merged ]
+        self.schedule()
+
+    def has(self, rel, length, tag):
+        i = bisect_left(self.starts, rel)
+        while i<len(self.starts) and self.starts[i]==rel:
+            if self.lens[i]==length and self.tags[i]==tag: return True
+            i += 1
+        return False
+
+    def insert(self, start, length, tag):
+        '''Add or replace a single highlight'''
+        rel = start-self.offset
+        i = bisect_left(self.starts, rel)
+        while i<len(self.starts) and self.starts[i]==rel:
+            if self.tags[i]==tag:  # same place, maybe the length changed
+                self.lens[i] = length
+                break
+            i += 1
+        else:
+            self.starts.insert(i, rel)
+            self.lens.insert(i, length)
+            self.tags.insert(i, tag)
+        self.maxlen = max(self.maxlen, length)
+        self.schedule()
+
+    def remove(self, tags):
+        '''Remove all the highlights with any of these tags'''
+        if type(tags)!=list: tags = [tags]
+        tags = set(tags)
+        keep = [ i for i in range(len(self.tags)) if self.tags[i] not in tags ]
+        if len(keep)==len(self.tags): return
+        self.starts = array('q', [ self.starts[i] for i in keep ])
+        self.lens = array('l', [ self.lens[i] for i in keep ])
+        self.tags = [ self.tags[i] for i in keep ]
+        self.schedule()
+
+    def clear(self):
+        self.starts = array('q')
+        self.lens = array('l')
+        self.tags = []
+        self.offset = 0
+        self.maxlen = 0
+        self.schedule()
+
+    def count(self, tags=None):
+        if tags==None: return len(self.tags)
+        if type(tags)!=list: tags = [tags]
+        tags = set(tags)
+        return sum(1 for t in self.tags if t in tags)
+
+    def positions(self):
+        '''All highlights as (starts, lengths) in document positions'''
+        return ([ s+self.offset for s in self.starts ], list(self.lens))
+
+    def lastEnd(self, tag):
+        for i in range(len(self.tags)-1, -1, -1):
+            if self.tags[i]==tag:
+                return self.starts[i]+self.offset+self.lens[i]
+        return -1
+
+    def contentsChange(self, position, removed, added):
+        if not self.starts: return
+        self.schedule()
+        rel = position-self.offset
+        # ones that start before the edit but run into it keep what's left
+        lo = bisect_left(self.starts, rel)
+        for i in range(bisect_left(self.starts, rel-self.maxlen), lo):
+            if self.starts[i]+self.lens[i]>rel:
+                self.lens[i] = rel-self.starts[i]
+        # ones that start in the replaced text are gone
+        hi = bisect_left(self.starts, rel+removed)
+        if hi>lo:
+            del self.starts[lo:hi]
+            del self.lens[lo:hi]
+            del self.tags[lo:hi]
+        if lo>=len(self.starts): return
+        delta = added-removed
+        if not delta: return
+        if lo==0:
+            self.offset += delta
+        else:
+            for i in range(lo, len(self.starts)):
+                self.starts[i] += delta
+
+    def covering(self, position):
+        '''Tags of the highlights that contain position'''
+        rel = position-self.offset
+        lo = bisect_left(self.starts, rel-self.maxlen)
+        hi = bisect_right(self.starts, rel)
+        return [ self.tags[i] for i in range(lo, hi) if self.starts[i]+self.lens[i]>=rel ]
+
+    def next(self, position):
+        '''Document position of the first highlight after position, or None'''
+        i = bisect_right(self.starts, position-self.offset)
+        if i<len(self.starts): return (self.starts[i]+self.offset, self.lens[i])
+        return None
+
+    def prev(self, position):
+        i = bisect_left(self.starts, position-self.offset)-1
+        if i>=0: return (self.starts[i]+self.offset, self.lens[i])
+        return None
+
+    def cursor(self, start, length):
+        c = QTextCursor(self.doc)
+        c.setPosition(start)
+        c.setPosition(start+length, QTextCursor.KeepAnchor)
+        return c
+
+    def render(self):
+        # only what's visible gets to be an extra selection
+        te = self.textedit
+        vp = te.viewport()
+        first = te.cursorForPosition(QPoint(0,0)).position()
+        last = te.cursorForPosition(QPoint(vp.width(), vp.height())).position()
+        lo = bisect_left(self.starts, first-self.maxlen-self.offset)
+        hi = bisect_right(self.starts, last-self.offset)
+        es = []
+        for i in range(lo, hi):
+            start = self.starts[i]+self.offset
+            if start+self.lens[i]<first: continue
+            fmt = self.formats.get(self.tags[i])
+            if not fmt: continue
+            e = QTextEdit.ExtraSelection()
+            e.cursor = self.cursor(start, self.lens[i])
+            e.format = fmt
+            es.append(e)
+        te.setExtraSelections(es)
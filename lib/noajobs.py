@@ -200,7 +200,10 @@ class jobItem():
             return
         # XXX need to send title to window??
         if self.outwinArgs: self.window.simpleargs(self.outwinArgs)
-        self.window.openfile(file)
+        if type(file)==list:
+            self.window.openMerged(file)  # qtail --merge
+        else:
+            self.window.openfile(file)
         
     def start(self, settings):
         self.process.setProcessEnvironment(settings.environment)
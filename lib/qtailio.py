@@ -0,0 +1,164 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Background reader for qtail
+#
+# Reads a file descriptor in its own thread, decodes UTF-8 incrementally
+# (so characters split across reads survive) and splits the result at
+# line ends.  Finished text is queued for the GUI thread, which is told
+# about it with a (queued) signal and takes as much as it wants.
+# The queue is bounded, so a fast producer just waits for the GUI.
+
+import os, codecs, queue, select, threading
+
+from PyQt5.QtCore import QThread
+from PyQt5.Qt import pyqtSignal
+
+def newDecoder():
+    return codecs.getincrementaldecoder('utf-8')(errors='backslashreplace')
+
+class readerThread(QThread):
+    ready = pyqtSignal()  # text is waiting in the queue
+    eof = pyqtSignal()    # no more data will ever come
+    reopened = pyqtSignal(str)  # followed file was truncated or replaced
+    def __init__(self, fd, offset=None, follow=False, blocksize=65536, path=None, parent=None):
+        super().__init__(parent)
+        self.fd = fd  # we own this and close it when done
+        self.offset = offset
+        self.follow = follow  # a growing file, wait at eof instead of quitting
+        self.path = path  # follow this name across rotation, like tail -F
+        self.blocksize = blocksize
+        self.queue = queue.Queue(maxsize=64) # SETTING?
+        self.wakeup = threading.Event()
+        self.done = False
+        self.caughtUp = False  # read everything there was, waiting for more
+        self.pollInterval = 1.0  # stat the file this often in case a change is missed
+
+    def wake(self):
+        self.wakeup.set()
+
+    def stop(self):
+        self.requestInterruption()
+        self.wakeup.set()
+        self.wait()
+
+    def put(self, text):
+        if not text: return
+        # only signal when the queue goes from empty to not empty
+        signal = self.queue.empty()
+        while not self.isInterruptionRequested():
+            try:
+                self.queue.put(text, timeout=0.25)
+                break
+            except queue.Full:
+                signal = True  # in case the GUI missed the last one
+                self.ready.emit()
+        if signal: self.ready.emit()
+
+    def readable(self, timeout):
+        try:
+            r,w,x = select.select([self.fd], [], [], timeout)
+        except (OSError, ValueError):
+            return True  # let read() report the problem
+        return bool(r)
+
+    def run(self):
+        decoder = newDecoder()
+        partial = ''
+        try:
+            if self.offset!=None:
+                os.lseek(self.fd, self.offset, os.SEEK_SET)
+            os.set_blocking(self.fd, True) # select() keeps us from hanging
+        except OSError:
+            pass
+        while not self.isInterruptionRequested():
+            if not self.readable(0.25): continue
+            try:
+                b = os.read(self.fd, self.blocksize)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                print('read failed: '+str(e)) # EXCEPT
+                b = b''
+                self.follow = False
+            if not b:
+                # end of what there is, hand over any leftover partial line
+                partial += decoder.decode(b'', final=not self.follow)
+                self.put(partial)
+                partial = ''
+                if not self.follow: break
+                if not self.caughtUp:
+                    # say so once, for anyone waiting on all of a file
+                    self.caughtUp = True
+                    self.ready.emit()
+                # any number of change notifications is one wakeup
+                self.wakeup.wait(self.pollInterval)
+                self.wakeup.clear()
+                if self.path and self.checkPath():
+                    decoder = newDecoder()
+                continue
+            self.caughtUp = False
+            text = partial + decoder.decode(b)
+            cut = text.rfind('\n')+1
+            if cut==len(text) or not self.readable(0):
+                # whole lines, or the writer paused mid-line
+                self.put(text)
+                partial = ''
+            else:
+                self.put(text[:cut])
+                partial = text[cut:]
+        self.done = True
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        self.eof.emit()
+
+    def checkPath(self):
+        '''At eof, see if the file was truncated or replaced (log rotation).
+           Returns true if we start over at the beginning of a file.
+        '''
+        try:
+            st = os.stat(self.path)
+            cur = os.fstat(self.fd)
+            pos = os.lseek(self.fd, 0, os.SEEK_CUR)
+        except OSError:
+            return False  # gone for now, keep waiting for it to come back
+        if (st.st_ino, st.st_dev)!=(cur.st_ino, cur.st_dev):
+            if cur.st_size>pos:
+                return False  # the old one got more before it was renamed, read that first
+            # we already read the old one to the end, switch to the new one
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except OSError:
+                return False
+            os.close(self.fd)
+            self.fd = fd
+            self.reopened.emit('{} was replaced, following new file'.format(self.path))
+            return True
+        if st.st_size<pos:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            self.reopened.emit('{} was truncated'.format(self.path))
+            return True
+        return False
+
+    def take(self, size):
+        '''Get at least size characters if there are that many waiting.
+           Returns None once the reader is finished and everything has
+           been taken.
+        '''
+        text = []
+        count = 0
+        while count<size:
+            try:
+                t = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            text.append(t)
+            count += len(t)
+        if not text and self.done and self.queue.empty():
+            return None
+        return ''.join(text)
+
+    def pending(self):
+        return not self.queue.empty()
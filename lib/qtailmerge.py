@@ -0,0 +1,144 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Follow several files in one qtail window, lines merged by timestamp
+#
+# Each file gets its own readerThread.  Lines are buffered per file with
+# a sort key from their timestamp (lines without one, like stack traces,
+# keep the key of the line before them so they stay attached), and a
+# heap over the heads of the buffers does a k-way merge, like sort -m.
+# A line can only go out once every file either has a later line
+# waiting or has been read to the end, otherwise a slow file could
+# still come up with something earlier.
+# This looks enough like a readerThread that qtail doesn't care.
+
+import os, heapq
+from collections import deque
+
+from PyQt5.QtCore import QObject
+from PyQt5.Qt import pyqtSignal
+
+from lib.qtailio import readerThread
+from lib.timestamps import timestampParser
+
+class mergeSource():
+    def __init__(self, reader, tag):
+        self.reader = reader
+        self.tag = tag
+        self.buf = deque()  # (key, line)
+        self.partial = ''   # not merged until the rest of the line shows up
+        self.lastKey = ()   # for lines without a timestamp
+
+    def caughtUp(self):
+        r = self.reader
+        return (r.caughtUp or r.done) and r.queue.empty()
+
+def sourceTags(filenames):
+    # short names unless that's ambiguous
+    tags = [ os.path.basename(f) for f in filenames ]
+    if len(set(tags))<len(tags): tags = list(filenames)
+    return tags
+
+class mergeReader(QObject):
+    ready = pyqtSignal()
+    eof = pyqtSignal()
+    reopened = pyqtSignal(str)
+    def __init__(self, filenames, offsets, regex=None, pollInterval=1.0, parent=None):
+        '''Follow filenames from offsets (open them first, so errors are the caller's)'''
+        super().__init__(parent)
+        self.parser = timestampParser(regex)
+        self.out = deque()  # merged lines waiting to be taken
+        self.done = False
+        self.sources = []
+        for (f, off, tag) in zip(filenames, offsets, sourceTags(filenames)):
+            r = readerThread(os.open(f, os.O_RDONLY), off, True, path=f, parent=self)
+            r.pollInterval = pollInterval
+            r.ready.connect(self.collect)
+            r.eof.connect(self.collect)
+            r.reopened.connect(self.reopened)
+            self.sources.append(mergeSource(r, tag))
+
+    def start(self):
+        for s in self.sources:
+            s.reader.start()
+
+    def wake(self):
+        for s in self.sources:
+            s.reader.wake()
+
+    def stop(self):
+        for s in self.sources:
+            s.reader.stop()
+            self.flush(s)
+        self.merge()
+        self.done = True
+
+    def collect(self):
+        # pull everything the readers have and merge what we can
+        for s in self.sources:
+            text = s.reader.take(1<<30)
+            if text:
+                text = s.partial + text
+                lines = text.split('\n')
+                s.partial = lines.pop()
+                for line in lines:
+                    self.addLine(s, line)
+            if s.reader.done and s.reader.queue.empty():
+                self.flush(s)
+        if all(s.caughtUp() for s in self.sources):
+            # every writer paused, like readerThread don't hold a partial line
+            for s in self.sources:
+                self.flush(s)
+        if self.merge():
+            self.ready.emit()
+        if all(s.reader.done for s in self.sources):
+            self.done = True
+            self.eof.emit()
+
+    def addLine(self, s, line):
+        key = self.parser.key(line)
+        if key==None: key = s.lastKey
+        s.lastKey = key
+        s.buf.append((key, '[{}] {}\n'.format(s.tag, line)))
+
+    def flush(self, s):
+        # end of the file or everyone paused, the last line doesn't need a newline
+        if s.partial:
+            self.addLine(s, s.partial)
+            s.partial = ''
+
+    def merge(self):
+        # k-way merge of the buffer heads for as long as that's safe
+        src = self.sources
+        if any(not s.buf and not s.caughtUp() for s in src):
+            return False
+        heap = [ (s.buf[0][0], i) for (i, s) in enumerate(src) if s.buf ]
+        heapq.heapify(heap)
+        count = 0
+        while heap:
+            (key, i) = heapq.heappop(heap)
+            s = src[i]
+            # take the whole run with this key, which keeps untimed lines
+            # with their parent even if another file has the same time
+            while True:
+                self.out.append(s.buf.popleft()[1])
+                count += 1
+                if not s.buf or s.buf[0][0]!=key: break
+            if s.buf:
+                heapq.heappush(heap, (s.buf[0][0], i))
+            elif not s.caughtUp():
+                break  # can't tell what comes next from this one
+        return count>0
+
+    def take(self, size):
+        if not self.out and self.done: return None
+        text = []
+        count = 0
+        while self.out and count<size:
+            t = self.out.popleft()
+            text.append(t)
+            count += len(t)
+        return ''.join(text)
+
+    def pending(self):
+        return bool(self.out)
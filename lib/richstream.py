@@ -0,0 +1,111 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Append markdown or html to a qtail document as it arrives
+#
+# Rendering has to start and stop somewhere a fragment makes sense on
+# its own: after a blank line outside a code fence for markdown, after a
+# block ending tag outside of tables and lists for html.  Text up to the
+# last such boundary is rendered for good.  Whatever is left is rendered
+# too so it can be seen, but it's removed and rendered again with the
+# next read, so only the unfinished part ever gets redone.
+
+import re
+
+from PyQt5.QtGui import QTextDocument, QTextDocumentFragment, QTextCursor, QTextBlockFormat, QTextCharFormat
+
+# html tags that end something that can be rendered by itself
+blockEnds = { 'p', 'div', 'br', 'hr', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'pre', 'table', 'ul', 'ol', 'dl', 'blockquote' }
+# and ones that fall apart if cut in the middle
+containers = { 'table', 'ul', 'ol', 'dl', 'pre' }
+tags = re.compile(r'<!--.*?-->|<(/?)([A-Za-z][\w:-]*)[^>]*>', re.S)
+fence = re.compile(r' {0,3}(```|~~~)')
+
+maxPending = 256*1024  # give up waiting for a boundary after this much
+
+def htmlBoundary(text):
+    '''End of the last complete piece of html in text, or 0'''
+    depth = 0
+    cut = 0
+    for m in tags.finditer(text):
+        name = m.group(2)
+        if not name: continue  # comment
+        name = name.lower()
+        if name in containers:
+            if m.group(1): depth = max(0, depth-1)
+            elif not m.group(0).endswith('/>'): depth += 1
+        if depth==0 and name in blockEnds and (m.group(1) or name in ('br', 'hr')):
+            cut = m.end()
+    return cut
+
+def markdownBoundary(text):
+    '''End of the last blank line outside of a code fence, or 0'''
+    cut = 0
+    pos = 0
+    infence = None
+    for line in text.splitlines(True):
+        pos += len(line)
+        if not line.endswith('\n'): break  # not finished yet
+        m = fence.match(line)
+        if m:
+            if not infence: infence = m.group(1)
+            elif m.group(1)==infence: infence = None
+        elif not infence and not line.strip():
+            cut = pos
+    return cut
+
+class richStream():
+    def __init__(self, doc, format='m'):
+        self.doc = doc
+        self.format = format  # m or h
+        self.busy = False
+        self.reset()
+        self.chars = doc.characterCount()
+        doc.contentsChange.connect(self.contentsChange)
+
+    def reset(self):
+        self.pending = ''  # text since the last boundary
+        self.tailLen = 0   # size of the temporary rendering of pending
+
+    def contentsChange(self, position, removed, added):
+        # document cleared, start over (but not when we're the ones doing it)
+        self.chars += added-removed
+        if removed and self.chars<=1 and not self.busy:
+            self.reset()
+
+    def insert(self, cursor, text):
+        '''Add text at cursor (the end of the document)'''
+        self.pending += text
+        if self.format=='h':
+            cut = htmlBoundary(self.pending)
+        else:
+            cut = markdownBoundary(self.pending)
+        if len(self.pending)>maxPending: cut = len(self.pending)
+        self.busy = True
+        cursor.beginEditBlock()
+        if self.tailLen:
+            cursor.movePosition(QTextCursor.End)
+            cursor.setPosition(max(0, cursor.position()-self.tailLen), QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        if cut:
+            self.render(cursor, self.pending[:cut])
+            self.pending = self.pending[cut:]
+        start = cursor.position()
+        if self.pending:
+            self.render(cursor, self.pending)
+        self.tailLen = cursor.position()-start
+        cursor.endEditBlock()  # (trimming the top happens here)
+        self.busy = False
+
+    def render(self, cursor, text):
+        # every piece starts with a new block, or it would run into the last one
+        if cursor.block().length()>1:
+            cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+        if self.format=='h':
+            cursor.insertHtml(text)
+            return
+        # QTextCursor can't insert markdown, but it can insert a document
+        tmp = QTextDocument()
+        tmp.setMarkdown(text)
+        cursor.insertFragment(QTextDocumentFragment(tmp))
@@ -0,0 +1,105 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# The last N lines of text, compactly
+#
+# Lines are kept UTF-8 encoded (newlines and all) in one bytearray with
+# an array of where each starts.  Dropping lines off the front just moves
+# the head; the space is reclaimed in one go once it's half the buffer,
+# so appending stays cheap however many lines are kept.
+# A million 80 character lines is about 90MB, where a QTextDocument
+# would need several times that plus layout.
+
+from array import array
+from itertools import accumulate
+
+class lineRing():
+    def __init__(self, maxLines=0):
+        self.maxLines = maxLines  # 0 for no limit
+        self.clear()
+
+    def clear(self):
+        self.data = bytearray()
+        self.starts = array('q')  # offset of each line in data, plus base
+        self.base = 0   # offset of data[0]
+        self.head = 0   # first line still kept in starts
+        self.partial = ''  # last line, when it hasn't ended yet
+        self.maxChars = 0  # longest line seen, for the scroll bar
+        self.dropped = 0   # lines dropped off the front, ever
+
+    def __len__(self):
+        return len(self.starts)-self.head + (1 if self.partial else 0)
+
+    def append(self, text):
+        '''Add text, returns the number of lines dropped off the front'''
+        if not text: return 0
+        text = self.partial + text
+        lines = text.split('\n')
+        self.partial = lines.pop()
+        if not lines: return 0
+        self.maxChars = max(self.maxChars, max(map(len, lines)))
+        whole = text[:len(text)-len(self.partial)]
+        b = whole.encode('utf-8', errors='backslashreplace')
+        if len(b)==len(whole):
+            lens = map(len, lines)  # ascii, characters are bytes
+        else:
+            lens = ( len(l.encode('utf-8', errors='backslashreplace')) for l in lines )
+        starts = list(accumulate(lens, lambda a,n: a+n+1, initial=self.base+len(self.data)))
+        starts.pop()  # that's where the next one will go
+        self.starts.extend(starts)
+        self.data += b
+        return self.trim()
+
+    def trim(self):
+        kept = len(self.starts)-self.head
+        if not self.maxLines or kept<=self.maxLines: return 0
+        drop = kept-self.maxLines
+        self.head += drop
+        self.dropped += drop
+        if self.head>len(self.starts)//2:
+            # reclaim the dead half
+            cut = self.starts[self.head]-self.base
+            del self.data[:cut]
+            self.base += cut
+            self.starts = self.starts[self.head:]
+            self.head = 0
+        return drop
+
+    def line(self, i):
+        n = len(self.starts)-self.head
+        if i==n and self.partial: return self.partial
+        if i<0 or i>=n: return ''
+        j = self.head+i
+        start = self.starts[j]-self.base
+        if j+1<len(self.starts):
+            end = self.starts[j+1]-self.base-1
+        else:
+            end = len(self.data)-1
+        return self.data[start:end].decode('utf-8', errors='replace')
+
+    def lines(self, first, last):
+        return [ self.line(i) for i in range(first, last) ]
+
+    def memory(self):
+        return len(self.data)+len(self.starts)*self.starts.itemsize
+
+    def find(self, regex, first=0, column=0):
+        '''First match of a bytes regex at or after column of line first,
+           as (line, column, length) in characters, or None
+        '''
+        if first>=len(self.starts)-self.head: return None
+        pos = self.starts[self.head+first]-self.base
+        if column: pos += len(self.line(first)[:column].encode('utf-8', errors='backslashreplace'))
+        m = regex.search(self.data, pos)
+        if not m: return None
+        # which line, and where in it in characters
+        (lo, hi) = (self.head+first, len(self.starts))
+        target = m.start()+self.base
+        while hi-lo>1:
+            mid = (lo+hi)//2
+            if self.starts[mid]<=target: lo = mid
+            else: hi = mid
+        start = self.starts[lo]-self.base
+        col = len(self.data[start:m.start()].decode('utf-8', errors='replace'))
+        length = len(m.group().decode('utf-8', errors='replace'))
+        return (lo-self.head, col, length)
@@ -0,0 +1,314 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Show a lineRing, painting only the lines on screen
+#
+# No document, no layout: the scroll bar counts lines, and each paint
+# draws the few dozen lines that are visible.  In exchange there's no
+# rich text, selection is by whole lines, and there is one search hit
+# at a time.
+#
+# Wrapping is lazy.  Since the scroll bar counts lines rather than
+# pixels (like QPlainTextEdit), only the lines on screen and the last
+# page (for the end of the scroll range) are ever laid out, and how many
+# rows each took is cached until the width or font changes.  Turning wrap
+# on for a million lines costs one screenful of layout.
+
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QFontMetricsF, QKeySequence, QColor, QTextLayout, QTextOption, QTextCharFormat
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication
+
+class ringView(QAbstractScrollArea):
+    margin = 4
+    cacheSize = 20000  # wrapped lines to remember
+    def __init__(self, ring, parent=None):
+        super().__init__(parent)
+        self.ring = ring
+        self.hit = None        # (line, column, length) of the last find
+        self.selection = None  # (anchor line, current line)
+        self.wrap = False
+        self.rowCache = {}     # absolute line number -> rows when wrapped
+        self.wrapOption = QTextOption()
+        self.wrapOption.setWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setFont(self.font())
+
+    def setFont(self, font):
+        super().setFont(font)
+        self.fm = QFontMetricsF(font)
+        self.lineHeight = self.fm.lineSpacing()
+        self.charWidth = self.fm.averageCharWidth()
+        self.rowCache.clear()
+        self.updateScroll()
+        self.viewport().update()
+
+    def setWrap(self, wrap):
+        end = self.atEnd()
+        self.wrap = wrap
+        self.rowCache.clear()
+        self.updateScroll()
+        if end: self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self.viewport().update()
+
+    def visibleLines(self):
+        # screen rows, which are lines when not wrapping
+        return max(1, int((self.viewport().height()-self.margin)//self.lineHeight))
+
+    def wrapWidth(self):
+        return max(self.charWidth*8, self.viewport().width()-2*self.margin)
+
+    def textLayout(self, text):
+        # one line wrapped at the view width, rows a lineHeight apart
+        layout = QTextLayout(text, self.font())
+        layout.setTextOption(self.wrapOption)
+        width = self.wrapWidth()
+        y = 0
+        layout.beginLayout()
+        while True:
+            line = layout.createLine()
+            if not line.isValid(): break
+            line.setLineWidth(width)
+            line.setPosition(QPointF(0, y))
+            y += self.lineHeight
+        layout.endLayout()
+        return layout
+
+    def rows(self, i):
+        '''Screen rows line i takes, laid out the first time it's asked'''
+        if not self.wrap: return 1
+        key = self.ring.dropped+i
+        n = self.rowCache.get(key)
+        if n: return n
+        text = self.ring.line(i).expandtabs()
+        if self.fm.horizontalAdvance(text)<=self.wrapWidth():
+            n = 1  # most lines fit, skip the layout
+        else:
+            n = self.textLayout(text).lineCount()
+        if not (self.ring.partial and i==len(self.ring)-1):  # that one can still grow
+            if len(self.rowCache)>self.cacheSize: self.rowCache.clear()
+            self.rowCache[key] = n
+        return n
+
+    def linesBefore(self, end, rows):
+        '''First line such that the lines from it up to end fit in rows'''
+        first = end
+        while first>0:
+            rows -= self.rows(first-1)
+            if rows<0: break
+            first -= 1
+        return first
+
+    def pageLines(self, top):
+        '''Lines at least partly on screen starting at top'''
+        if not self.wrap: return self.visibleLines()
+        rows = self.visibleLines()
+        n = 0
+        while rows>0 and top+n<len(self.ring):
+            rows -= self.rows(top+n)
+            n += 1
+        return max(1, n)
+
+    def atEnd(self):
+        vb = self.verticalScrollBar()
+        return vb.value()>=vb.maximum()
+
+    def updateScroll(self):
+        n = len(self.ring)
+        page = self.visibleLines()
+        vb = self.verticalScrollBar()
+        hb = self.horizontalScrollBar()
+        if self.wrap:
+            # only the last page is measured, a line taller than the screen still gets a turn at the top
+            vb.setRange(0, max(0, min(self.linesBefore(n, page), n-1)))
+            vb.setPageStep(max(1, self.pageLines(vb.value())-1))
+            hb.setRange(0, 0)
+            return
+        vb.setRange(0, max(0, n-page))
+        vb.setPageStep(page)
+        hb.setRange(0, max(0, int(self.ring.maxChars*self.charWidth+2*self.margin-self.viewport().width())))
+        hb.setPageStep(self.viewport().width())
+        hb.setSingleStep(int(self.charWidth*4))
+
+    def appended(self, dropped, follow=True):
+        '''Call after adding to the ring with what append() returned'''
+        vb = self.verticalScrollBar()
+        end = self.atEnd()
+        top = vb.value()-dropped  # keep showing the same lines
+        if self.hit:
+            line = self.hit[0]-dropped
+            self.hit = (line,)+self.hit[1:] if line>=0 else None
+        if self.selection:
+            self.selection = tuple( max(0, l-dropped) for l in self.selection )
+        self.updateScroll()
+        if follow or end:
+            # like a terminal, stay at the end if that's where we were
+            vb.setValue(vb.maximum())
+        else:
+            vb.setValue(max(0, top))
+        self.viewport().update()
+
+    def jumpToEndMaybe(self, follow):
+        if follow: self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def clear(self):
+        self.ring.clear()
+        self.hit = self.selection = None
+        self.updateScroll()
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.wrap and event.size().width()!=event.oldSize().width():
+            self.rowCache.clear()
+        end = self.atEnd()
+        self.updateScroll()
+        if end: self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def topLine(self):
+        return self.verticalScrollBar().value()
+
+    def lineAt(self, y):
+        row = int((y-self.margin)//self.lineHeight)
+        if not self.wrap: return self.topLine()+row
+        i = self.topLine()
+        if row<0: return i-1
+        while i<len(self.ring)-1:
+            row -= self.rows(i)
+            if row<0: break
+            i += 1
+        return i
+
+    def showLine(self, line):
+        # center it if it's off screen
+        top = self.topLine()
+        page = self.visibleLines()
+        if self.wrap:
+            if line<top or line>=top+self.pageLines(top)-1:
+                self.verticalScrollBar().setValue(self.linesBefore(line, page//2))
+        elif line<top or line>=top+page:
+            self.verticalScrollBar().setValue(line-page//2)
+        self.viewport().update()
+
+    def showHit(self, hit):
+        self.hit = hit
+        if not hit: return
+        (line, col, length) = hit
+        self.showLine(line)
+        if self.wrap: return
+        # and sideways
+        text = self.ring.line(line)
+        x = self.fm.horizontalAdvance(text[:col].expandtabs())
+        hb = self.horizontalScrollBar()
+        if x<hb.value() or x>hb.value()+self.viewport().width()-self.margin*2:
+            hb.setValue(int(x-self.viewport().width()/3))
+
+    def paintEvent(self, event):
+        p = QPainter(self.viewport())
+        pal = self.palette()
+        p.fillRect(event.rect(), pal.base())
+        p.setFont(self.font())
+        top = self.topLine()
+        x0 = self.margin-self.horizontalScrollBar().value()
+        lh = self.lineHeight
+        width = self.viewport().width()
+        sel = None
+        if self.selection: sel = (min(self.selection), max(self.selection))
+        if self.wrap:
+            self.paintWrapped(p, top, sel)
+            p.end()
+            return
+        y = self.margin
+        for i in range(top, min(len(self.ring), top+self.visibleLines()+1)):
+            text = self.ring.line(i)
+            if sel and sel[0]<=i<=sel[1]:
+                p.fillRect(QRectF(0, y, width, lh), pal.highlight())
+                p.setPen(pal.highlightedText().color())
+            else:
+                p.setPen(pal.text().color())
+            if self.hit and self.hit[0]==i:
+                (line, col, length) = self.hit
+                start = self.fm.horizontalAdvance(text[:col].expandtabs())
+                end = self.fm.horizontalAdvance(text[:col+length].expandtabs())
+                p.fillRect(QRectF(x0+start, y, max(end-start, 2), lh), QColor(Qt.yellow))
+            p.drawText(QPointF(x0, y+self.fm.ascent()), text.expandtabs())
+            y += lh
+        p.end()
+
+    def paintWrapped(self, p, top, sel):
+        pal = self.palette()
+        lh = self.lineHeight
+        width = self.viewport().width()
+        height = self.viewport().height()
+        y = self.margin
+        i = top
+        while i<len(self.ring) and y<height:
+            raw = self.ring.line(i)
+            layout = self.textLayout(raw.expandtabs())
+            h = layout.lineCount()*lh
+            formats = []
+            if sel and sel[0]<=i<=sel[1]:
+                p.fillRect(QRectF(0, y, width, h), pal.highlight())
+                p.setPen(pal.highlightedText().color())
+            else:
+                p.setPen(pal.text().color())
+            if self.hit and self.hit[0]==i:
+                (line, col, length) = self.hit
+                r = QTextLayout.FormatRange()
+                r.start = len(raw[:col].expandtabs())
+                r.length = len(raw[:col+length].expandtabs())-r.start
+                r.format = QTextCharFormat()
+                r.format.setBackground(QColor(Qt.yellow))
+                formats.append(r)
+            layout.draw(p, QPointF(self.margin, y), formats)
+            y += h
+            i += 1
+
+    def keyPressEvent(self, event):
+        vb = self.verticalScrollBar()
+        key = event.key()
+        if event.matches(QKeySequence.Copy):
+            self.copy()
+        elif key==Qt.Key_Home and event.modifiers()&Qt.ControlModifier:
+            vb.setValue(0)
+        elif key==Qt.Key_End and event.modifiers()&Qt.ControlModifier:
+            vb.setValue(vb.maximum())
+        elif key==Qt.Key_Up: vb.triggerAction(vb.SliderSingleStepSub)
+        elif key==Qt.Key_Down: vb.triggerAction(vb.SliderSingleStepAdd)
+        elif key==Qt.Key_PageUp: vb.triggerAction(vb.SliderPageStepSub)
+        elif key==Qt.Key_PageDown: vb.triggerAction(vb.SliderPageStepAdd)
+        else:
+            super().keyPressEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button()!=Qt.LeftButton: return super().mousePressEvent(event)
+        if not len(self.ring): return
+        line = max(0, min(self.lineAt(event.y()), len(self.ring)-1))
+        if event.modifiers()&Qt.ShiftModifier and self.selection:
+            self.selection = (self.selection[0], line)
+        else:
+            self.selection = (line, line)
+        self.viewport().update()
+
+    def mouseMoveEvent(self, event):
+        if not self.selection or not event.buttons()&Qt.LeftButton: return
+        line = max(0, min(self.lineAt(event.y()), len(self.ring)-1))
+        self.selection = (self.selection[0], line)
+        if event.y()<0: self.verticalScrollBar().triggerAction(self.verticalScrollBar().SliderSingleStepSub)
+        elif event.y()>self.viewport().height(): self.verticalScrollBar().triggerAction(self.verticalScrollBar().SliderSingleStepAdd)
+        self.viewport().update()
+
+    def mouseReleaseEvent(self, event):
+        if self.selection and QApplication.clipboard().supportsSelection():
+            QApplication.clipboard().setText(self.selectedText(), QApplication.clipboard().Selection)
+
+    def selectedText(self):
+        if not self.selection: return ''
+        (a, b) = (min(self.selection), max(self.selection))
+        return '\n'.join(self.ring.lines(a, b+1))
+
+    def copy(self):
+        if self.selection:
+            QApplication.clipboard().setText(self.selectedText())
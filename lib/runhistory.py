@@ -0,0 +1,42 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Output of past watch runs, compressed and limited to a memory cap
+#
+# Watch output tends to be small and repetitive, so zlib gets most of
+# it down to almost nothing.  The oldest runs are dropped to stay under
+# the cap, so a monitor left running overnight stays the same size.
+
+import time, zlib
+from collections import deque
+
+class runHistory():
+    def __init__(self, cap=4*1024*1024):
+        self.cap = cap    # bytes of compressed output to keep
+        self.runs = deque()  # (time, exitcode, compressed text)
+        self.size = 0
+        self.dropped = 0  # runs before the first one kept, for numbering
+
+    def __len__(self):
+        return len(self.runs)
+
+    def add(self, text, exitcode=None):
+        z = zlib.compress(text.encode('utf-8', errors='backslashreplace'))
+        self.runs.append((time.time(), exitcode, z))
+        self.size += len(z)
+        self.trim()
+
+    def trim(self):
+        # keep the newest one even if it's over by itself
+        while self.size>self.cap and len(self.runs)>1:
+            self.size -= len(self.runs.popleft()[2])
+            self.dropped += 1
+
+    def text(self, i):
+        return zlib.decompress(self.runs[i][2]).decode('utf-8', errors='backslashreplace')
+
+    def describe(self, i):
+        (when, exitcode, z) = self.runs[i]
+        desc = 'run {} at {}'.format(self.dropped+i+1, time.strftime('%H:%M:%S', time.localtime(when)))
+        if exitcode: desc += ' (exit {})'.format(exitcode)
+        return desc
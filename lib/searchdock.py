@@ -4,90 +4,220 @@ __copyright__ = '2023, Steven Dick <kg4ydw@gmail.com>'
 
 # handle search results and bookmarks
 
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from functools import partial
 
-from PyQt5.Qt import Qt, pyqtSignal
-from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5.Qt import Qt, pyqtSignal, QAbstractTableModel
+from PyQt5.QtCore import QModelIndex
+from PyQt5 import QtGui, QtWidgets
 from PyQt5.QtGui import QTextCursor, QColor
-from PyQt5.QtWidgets import QDockWidget, QTextEdit, QMenu
+from PyQt5.QtWidgets import QDockWidget, QMenu, QCheckBox
 
 from lib.searchdock_ui import Ui_searchDock
-from lib.datamodels import itemListModel
+from lib.typedqsettings import typedQSettings
+
+typedQSettings().registerOptions({
+    'QTailLiveSearch': [True, 'Keep qtail search results up to date as text arrives', bool],
+})
 
 from lib.colorpicker import ColorPicker
 
 colorpicker = ColorPicker()
 
 class selItem():
-    def __init__(self, cursor, context=True):
-        # save in case it goes out of context
-        self.cursor = cursor
-        self.text = cursor.selectedText()
-        self.line = cursor.blockNumber()
-        # XX get pretext and posttext
-        pos = cursor.position()
-        anchor = cursor.anchor()
+    # context straight from the block text, cursors are slow off screen
+    def __init__(self, doc, pos, length, context=True):
+        block = doc.findBlock(pos)
+        self.line = block.blockNumber()
+        text = block.text()
+        off = pos-block.position()
         contextChars = 20 # XXX setting
-        if anchor>pos: # swap!!
-            (pos,anchor) = (anchor,pos)
-            cursor.setPosition(anchor, QTextCursor.MoveAnchor)
-            cursor.setPosition(pos, QTextCursor.KeepAnchor)
-        if not context or cursor.atBlockStart():
-            self.pretext = ''
+        if max(text, default='')>'\uffff':
+            # positions are UTF-16, so slice it that way
+            t16 = text.encode('utf-16-le')
+            def part(a, b):
+                a = max(a, 0)
+                return t16[a*2:b*2].decode('utf-16-le', errors='ignore')
         else:
-            c = QTextCursor(cursor)
-            c.setPosition(anchor, QTextCursor.KeepAnchor)
-            c.movePosition(QTextCursor.PreviousCharacter,QTextCursor.KeepAnchor , contextChars)
-            if self.line!=c.blockNumber(): # fell off, start over
-                #c = QTextCursor(cursor)
-                c.setPosition(anchor, QTextCursor.KeepAnchor)
-                c.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor, 1)
-            self.pretext = c.selectedText()
-        if not context or cursor.atBlockEnd():
-            self.posttext = ''
+            def part(a, b):
+                return text[max(a, 0):b]
+        self.text = part(off, off+length)
+        if context:
+            self.pretext = part(off-contextChars, off)
+            self.posttext = part(off+length, off+length+contextChars)
         else:
-            c = QTextCursor(cursor)
-            c.clearSelection()
-            c.movePosition(QTextCursor.NextCharacter, QTextCursor.KeepAnchor, contextChars)
-            if self.line!=c.blockNumber(): # fell off, start over
-                c.setPosition(pos, QTextCursor.KeepAnchor)
-                #c = QTextCursor(cursor)
-                c.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor, 1)
-            self.posttext = c.selectedText()
-
-class selList(itemListModel):
-    def __init__(self):
-        super().__init__(['pre','item','post'])
+            self.pretext = self.posttext = ''
+
+class selList(QAbstractTableModel):
+    # Only positions are stored, in compact sorted arrays.  The context
+    # for a row is built when the view asks for it, and only the last
+    # few hundred are kept.
+    # Stored positions are relative to self.offset, so trimming the top
+    # of the document is one addition rather than a pass over every hit.
+    def __init__(self, doc):
+        super().__init__()
+        self.headers = ['pre','item','post']
         self.color = None
         self.haspre = self.hasitem = self.haspost = False
-        
+        self.doc = doc
+        self.pos = array('q')
+        self.len = array('l')
+        self.offset = 0
+        self.maxlen = 0  # longest hit, bounds the look back in contentsChange
+        self.cache = OrderedDict()
+        self.cacheSize = 500 # XX SETTING?
+        doc.contentsChange.connect(self.contentsChange)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def rowCount(self, parent=None):
+        return len(self.pos)
+
+    def columnCount(self, parent=None):
+        return len(self.headers)
+
+    def clear(self):
+        self.beginResetModel()
+        self.pos = array('q')
+        self.len = array('l')
+        self.offset = 0
+        self.maxlen = 0  # longest hit, bounds the look back in contentsChange
+        self.cache.clear()
+        self.endResetModel()
+
     def setSel(self, extraSelections):
-        self.removeRows(0, len(self.data),None) # XX always purge?
-        # insert rows in batches for better performance
-        rows = []
+        hits = []
         for sel in extraSelections:
-            if sel.cursor.position() or sel.cursor.hasSelection(): # skip stale highlights
-                item = selItem(sel.cursor)
-                # self.appendItem(item)
-                rows.append(item)
-                if item.pretext: self.haspre = True
-                if item.text: self.hasitem = True
-                if item.posttext: self.haspost = True
-            #if len(rows)&7==0: # this would make it negligibly faster but more chunky
-            QtCore.QCoreApplication.processEvents()
-            if len(rows)>=1000: # XXX SETTING
-                self.insertRowsAt(1,rows)
-                rows=[]
-        if rows: # and the leftovers
-            self.insertRowsAt(1,rows)
+            c = sel.cursor
+            if c.position() or c.hasSelection(): # skip stale highlights
+                hits.append((c.selectionStart(), c.selectionEnd()-c.selectionStart()))
+        hits.sort()
+        self.setPositions([ h[0] for h in hits ], [ h[1] for h in hits ])
+
+    def setPositions(self, pos, lens):
+        self.clear()
+        self.appendPositions(pos, lens)
+        self.sampleContext()
+
+    def appendPositions(self, pos, lens):
+        # positions must be sorted and after what's already here
+        if not pos: return
+        first = len(self.pos)
+        self.beginInsertRows(QModelIndex(), first, first+len(pos)-1)
+        off = self.offset
+        self.pos.extend([ p-off for p in pos ])
+        self.len.extend(lens)
+        self.maxlen = max(self.maxlen, max(lens))
+        self.endInsertRows()
+
+    def appendSel(self, cursors):
+        self.appendPositions([ c.selectionStart() for c in cursors ],
+                             [ c.selectionEnd()-c.selectionStart() for c in cursors ])
+        self.sampleContext(len(self.pos)-len(cursors))
+
+    def insertSel(self, cursor):
+        # keep it sorted, these can come in any order
+        p = cursor.selectionStart()
+        row = bisect_left(self.pos, p-self.offset)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.pos.insert(row, p-self.offset)
+        self.len.insert(row, cursor.selectionEnd()-p)
+        self.maxlen = max(self.maxlen, cursor.selectionEnd()-p)
+        self.endInsertRows()
+        self.sampleContext(row, 1)
+
+    def sampleContext(self, first=0, count=200):
+        # decide which columns are worth showing without looking at everything
+        for row in range(first, min(first+count, len(self.pos))):
+            item = self.item(row)
+            if item.pretext: self.haspre = True
+            if item.text: self.hasitem = True
+            if item.posttext: self.haspost = True
+
+    def contentsChange(self, position, removed, added):
+        if not self.pos: return
+        rel = position-self.offset
+        lo = bisect_left(self.pos, rel)
+        # hits that run into the edit keep what's left of them
+        clipped = False
+        for i in range(bisect_left(self.pos, rel-self.maxlen), lo):
+            if self.pos[i]+self.len[i]>rel:
+                self.len[i] = rel-self.pos[i]
+                clipped = True
+        # hits in replaced text are gone
+        hi = bisect_left(self.pos, rel+removed)
+        if hi>lo:
+            self.beginRemoveRows(QModelIndex(), lo, hi-1)
+            del self.pos[lo:hi]
+            del self.len[lo:hi]
+            self.endRemoveRows()
+        # and everything after moved
+        delta = added-removed
+        if lo<len(self.pos) and delta:
+            if lo==0:
+                self.offset += delta
+            else:
+                for i in range(lo, len(self.pos)):
+                    self.pos[i] += delta
+        if position==0 and not added:
+            return  # qtail's usual trim from the top, the context didn't change
+        if not clipped and lo>=len(self.pos):
+            return  # past the last hit, usually appending
+        # the context around the edit is stale (and ours are cached by position)
+        self.cache.clear()
+        if self.pos:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.pos)-1, len(self.headers)-1))
+
+    def position(self, row):
+        return self.pos[row]+self.offset
+
+    def cursor(self, row):
+        c = QTextCursor(self.doc)
+        p = self.pos[row]+self.offset
+        c.setPosition(p)
+        c.setPosition(p+self.len[row], QTextCursor.KeepAnchor)
+        return c
+
+    def item(self, row):
+        key = (self.pos[row], self.len[row])
+        item = self.cache.get(key)
+        if item:
+            self.cache.move_to_end(key)
+            return item
+        item = selItem(self.doc, self.pos[row]+self.offset, self.len[row])
+        self.cache[key] = item
+        if len(self.cache)>self.cacheSize:
+            self.cache.popitem(last=False)
+        return item
+
+    def getItem(self, index):
+        if not index or not index.isValid() or index.row()>=len(self.pos): return None
+        return self.item(index.row())
+
+    def rowAt(self, position):
+        # row of the hit covering position, or None
+        row = bisect_right(self.pos, position-self.offset)-1
+        if row<0: return None
+        if position<=self.pos[row]+self.offset+self.len[row]:
+            return row
+        return None
+
+    def lastEnd(self):
+        if not self.pos: return -1
+        return self.pos[-1]+self.offset+self.len[-1]
 
     def headerData(self, col, orientation, role):
         if orientation==Qt.Horizontal and col==1 and role==Qt.BackgroundRole and self.color:
             return self.color
-        if role==Qt.DisplayRole and orientation==Qt.Vertical and col<len(self.data):
-            return str(self.data[col].line+1)
-        else:
-            return super().headerData(col, orientation, role)
+        if role==Qt.DisplayRole:
+            if orientation==Qt.Horizontal and col<len(self.headers):
+                return self.headers[col]
+            if orientation==Qt.Vertical and col<len(self.pos):
+                return str(self.item(col).line+1)
+        return None
 
     def setColor(self, c):
         self.color = c
@@ -99,8 +229,9 @@ class selList(itemListModel):
             if col==0: return Qt.AlignRight
             elif col==1: return Qt.AlignCenter
             elif col==2: return Qt.AlignLeft
+        if role not in (Qt.DisplayRole, Qt.EditRole): return None
         item = self.getItem(index)
-        if not item or role not in (Qt.DisplayRole, Qt.EditRole): return None
+        if not item: return None
         col = index.column()
         if col==0: return item.pretext
         elif col==1: return item.text
@@ -108,17 +239,30 @@ class selList(itemListModel):
         else: return None
     
 class searchDock(QDockWidget):
-    showSel = pyqtSignal(list)
-    hideSel = pyqtSignal(list)
+    showSel = pyqtSignal(object, object)  # positions, lengths
+    hideSel = pyqtSignal()
     gotoSel = pyqtSignal(QTextCursor)
     
-    def __init__(self, parent, title=None, selections=None, searchterm=None, findflags=None):
+    def __init__(self, parent, title=None, selections=None, searchterm=None, findflags=None, positions=None):
         super().__init__(parent)
         self.ui = Ui_searchDock()
         self.ui.setupUi(self)
-        self.ui.tableView.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        # sizing every row to its contents would read every row
+        vh = self.ui.tableView.verticalHeader()
+        vh.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        vh.setDefaultSectionSize(self.ui.tableView.fontMetrics().height()+4)
         self.searchterm = searchterm # XXX use these later
         self.findflags = findflags
+        self.shown = False  # our highlights are in the document
+        self.mark = None  # end of what we've searched
+        # live search new text as it arrives
+        self.ui.liveCheck = QCheckBox('live', self)
+        self.ui.liveCheck.setToolTip('Search new text as it arrives')
+        self.ui.horizontalLayout.addWidget(self.ui.liveCheck)
+        if searchterm:
+            self.ui.liveCheck.setChecked(typedQSettings().value('QTailLiveSearch', True))
+        else:
+            self.ui.liveCheck.setEnabled(False)
 
         # stuff this in a corner of the parent QMainWindow
         parent.addDockWidget(Qt.LeftDockWidgetArea, self)
@@ -126,17 +270,21 @@ class searchDock(QDockWidget):
         global colorpicker
         color = colorpicker.nextColor()
         self.color = QtGui.QBrush(QColor(color))
-        self.model = selList()
+        self.model = selList(parent.textbody.document())
         self.ui.tableView.setModel(self.model)
         # set up connections before the data is loaded
-        self.ui.showButton.clicked.connect(partial(self.emitExtraSelections, self.showSel))
-        self.ui.hideButton.clicked.connect(partial(self.emitExtraSelections, self.hideSel))
+        self.ui.showButton.clicked.connect(partial(self.showHide, True))
+        self.ui.hideButton.clicked.connect(partial(self.showHide, False))
         self.ui.tableView.clicked.connect(self.gotoIndex)
         if title:
             self.setWindowTitle(title)
         self.favcol = 1 # item to scroll to (possibly only visible column)
-        if selections:
-            self.setSel(selections)
+        if positions:
+            self.model.setPositions(*positions)
+        elif selections:
+            self.model.setSel(selections)
+        if len(self.model):
+            self.ui.tableView.resizeColumnsToContents()
             if title and title!='Highlights':
                 tv = self.ui.tableView
                 # hide empty columns
@@ -149,46 +297,74 @@ class searchDock(QDockWidget):
         self.model.setColor(self.color)
 
     def gotoIndex(self, index):
-        item = self.model.getItem(index)
-        if item:
-            self.gotoSel.emit(item.cursor)
+        if index.isValid() and index.row()<len(self.model):
+            self.gotoSel.emit(self.model.cursor(index.row()))
 
     # opposite of gotoIndex
     def findSelection(self, cursor):
-        pos = cursor.position()
-        for index in self.model:
-            ic = self.model.getItem(index).cursor
-            c1 = ic.anchor()
-            c2 = ic.position()
-            if c1>c2:
-                (c1,c2) = (c2,c1)
-            if c1<=pos and pos<=c2:
-                self.ui.tableView.setCurrentIndex(index)
-                self.ui.tableView.scrollTo(index.siblingAtColumn(self.favcol))
-                return
-        # not found
+        row = self.model.rowAt(cursor.position())
+        if row!=None:
+            index = self.model.index(row, self.favcol)
+            self.ui.tableView.setCurrentIndex(index)
+            self.ui.tableView.scrollTo(index)
+        # else not found
 
     def setSel(self, extraSelections):
         self.model.setSel(extraSelections)
         self.ui.tableView.resizeColumnsToContents()
 
+    def setMark(self, doc, mark=None):
+        # everything up to here has been searched
+        if mark:
+            self.mark = QTextCursor(mark)
+        else:
+            self.mark = QTextCursor(doc)
+            self.mark.movePosition(QTextCursor.End)
+        self.mark.setKeepPositionOnInsert(True)
+
+    def scanNew(self, doc):
+        '''Search only the text added since the last scan.
+           (The model forgets hits trimmed off the top by itself.)
+        '''
+        if not self.mark or not self.ui.liveCheck.isChecked(): return
+        # back up to the start of the line in case the last one was partial
+        c = QTextCursor(self.mark)
+        c.movePosition(QTextCursor.StartOfBlock)
+        last = self.model.lastEnd()
+        found = []
+        prev = -1
+        c = doc.find(self.searchterm, c, self.findflags)
+        while not c.isNull() and c.position()>=0:
+            if c.selectionStart()>=last:
+                found.append(c)
+            if not c.hasSelection(): # zero size match, see findAll
+                c = QTextCursor(c)
+                c.movePosition(QTextCursor.NextWord, QTextCursor.MoveAnchor, 1)
+                if c.position()==prev: break
+            prev = c.position()
+            c = doc.find(self.searchterm, c, self.findflags)
+        self.mark.movePosition(QTextCursor.End)
+        if not found: return
+        self.model.appendSel(found)
+        if self.shown: # highlight the new ones too
+            self.showSel.emit([ c.selectionStart() for c in found ],
+                              [ c.selectionEnd()-c.selectionStart() for c in found ])
+
     def addSel(self, cursor):
-        self.model.appendItem(selItem(cursor))
+        self.model.insertSel(cursor)
         self.ui.tableView.resizeColumnsToContents()
 
-    def emitExtraSelections(self, signal):
-        es = []
-        for i in self.model.data:
-            e = QTextEdit.ExtraSelection()
-            e.cursor = i.cursor
-            e.format.setBackground(self.color)
-            es.append(e)
-        signal.emit(es)
+    def showHide(self, show):
+        if self.shown: self.hideSel.emit()
+        self.shown = show
+        if show:
+            m = self.model
+            self.showSel.emit([ m.position(row) for row in range(len(m)) ], list(m.len))
 
     def setColor(self, color):
         self.color = QtGui.QBrush(QColor(color))
         self.model.setColor(self.color)
-        self.emitExtraSelections(self.showSel)
+        self.showHide(True)
         
     def contextMenuEvent(self, event):
         global colorpicker
@@ -0,0 +1,92 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Search a snapshot of a qtail document in a worker thread
+#
+# QTextDocument.find() has to run on the GUI thread and is slow for big
+# documents, so instead take the plain text and run a
+# QRegularExpression over it in a thread.  Hits come back in batches of
+# (block, offset, length) and the GUI builds cursors for each batch.
+# Positions are in UTF-16 units, just like QTextDocument positions.
+
+from bisect import bisect_right
+from itertools import accumulate
+
+from PyQt5.QtCore import QThread, QRegularExpression as QRE
+from PyQt5.QtGui import QTextDocument
+from PyQt5.Qt import pyqtSignal
+
+def toRegex(searchterm, findflags=None):
+    '''Turn a buildSearch() result and find flags into a QRegularExpression'''
+    if findflags==None: findflags = QTextDocument.FindFlags()
+    if isinstance(searchterm, QRE):
+        pattern = searchterm.pattern()
+        opts = searchterm.patternOptions()
+    else:
+        pattern = QRE.escape(searchterm)
+        opts = QRE.MultilineOption
+        if not (findflags & QTextDocument.FindCaseSensitively):
+            opts |= QRE.CaseInsensitiveOption
+    if findflags & QTextDocument.FindWholeWords:
+        pattern = r'\b(?:' + pattern + r')\b'
+    return QRE(pattern, opts)
+
+def blockStarts(text):
+    '''Position of the start of each line of text in UTF-16 units'''
+    lines = text.split('\n')
+    if not text or max(text)<='\uffff':
+        lens = map(len, lines)
+    else: # characters outside the BMP count twice
+        lens = (len(line.encode('utf-16-le'))//2 for line in lines)
+    return list(accumulate(lens, lambda a,b: a+b+1, initial=0))[:-1]
+
+def whichGroup(match, names):
+    # index of the named group that matched, for combined patterns
+    for i in range(len(names)):
+        if match.capturedStart(names[i])>=0:
+            return i
+    return -1
+
+class searchThread(QThread):
+    found = pyqtSignal(list) # batch of (block, offset, length) or (block, offset, length, group)
+    def __init__(self, text, regex, batch=5000, names=None, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.regex = regex
+        self.batch = batch
+        self.names = names  # report which of these named groups matched
+        self.count = 0
+
+    def run(self):
+        starts = blockStarts(self.text)
+        if self.isInterruptionRequested(): return
+        hits = []
+        lastblock = -1
+        it = self.regex.globalMatch(self.text)
+        n = 0
+        while it.hasNext():
+            n += 1
+            if n&255==0 and self.isInterruptionRequested(): return
+            m = it.next()
+            pos = m.capturedStart()
+            length = m.capturedLength()
+            block = bisect_right(starts, pos)-1
+            offset = pos-starts[block]
+            if length==0:
+                # one empty match per line is plenty
+                if block==lastblock: continue
+            elif block+1<len(starts) and pos+length>starts[block+1]:
+                # QTextDocument.find() doesn't match across lines either
+                length = starts[block+1]-1-pos
+            lastblock = block
+            if self.names:
+                hits.append((block, offset, length, whichGroup(m, self.names)))
+            else:
+                hits.append((block, offset, length))
+            if len(hits)>=self.batch:
+                self.count += len(hits)
+                self.found.emit(hits)
+                hits = []
+        if hits and not self.isInterruptionRequested():
+            self.count += len(hits)
+            self.found.emit(hits)
@@ -0,0 +1,89 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Guess how big a qtail document would be without laying it out
+#
+# QTextDocument.adjustSize() lays out the whole document, which takes
+# forever on big outputs.  Instead keep a histogram of line lengths as
+# text arrives (or sample the blocks of a document that was loaded some
+# other way), measure a few real lines to get the width of a character,
+# and work out width and wrapped height from that.
+
+from collections import Counter
+from math import ceil
+
+from PyQt5.QtGui import QFontMetricsF
+
+class sizeEstimator():
+    def __init__(self, doc, percentile=98):
+        self.percentile = percentile  # ignore the longest few lines
+        self.reset()
+        self.doc = doc
+        self.chars = doc.characterCount()
+        doc.contentsChange.connect(self.contentsChange)
+
+    def contentsChange(self, position, removed, added):
+        # cleared or replaced, start over (trimming the top doesn't matter)
+        # (don't touch the document here, this happens while it is destroyed too)
+        self.chars += added-removed
+        if removed and self.chars<=1:
+            self.reset()
+
+    def reset(self):
+        self.hist = Counter()   # line length: count
+        self.count = 0
+        self.samples = []       # a few real lines to measure
+        self.maxSamples = 64
+
+    def add(self, text):
+        if not text: return
+        if '\t' in text: text = text.expandtabs()
+        lines = text.split('\n')
+        if not lines[-1]: lines.pop()  # text usually ends with a newline
+        self.addLines(lines)
+
+    def addLines(self, lines):
+        self.hist.update(map(len, lines))
+        self.count += len(lines)
+        if len(self.samples)<self.maxSamples:
+            self.samples += [ l for l in lines[:self.maxSamples-len(self.samples)] if l ]
+
+    def sample(self, limit=1000):
+        # for documents filled some other way than add()
+        self.reset()
+        doc = self.doc
+        n = doc.blockCount()
+        step = max(1, n//limit)
+        lines = []
+        for i in range(0, n, step):
+            lines.append(doc.findBlockByNumber(i).text().expandtabs())
+        self.addLines(lines)
+
+    def charWidth(self, font):
+        fm = QFontMetricsF(font)
+        chars = sum(map(len, self.samples))
+        if not chars: return fm.averageCharWidth()
+        return sum(map(fm.horizontalAdvance, self.samples))/chars
+
+    def columns(self):
+        # line length that covers percentile of the lines
+        if not self.count: return 0
+        want = self.count*self.percentile/100
+        seen = 0
+        for length in sorted(self.hist):
+            seen += self.hist[length]
+            if seen>=want: return length
+        return max(self.hist)
+
+    def width(self, font, margin=4):
+        return self.columns()*self.charWidth(font) + 2*margin
+
+    def height(self, font, blocks, wrapwidth=None, margin=4, lineHeight=None):
+        '''Height of blocks lines, wrapped at wrapwidth pixels if given'''
+        if not lineHeight: lineHeight = QFontMetricsF(font).lineSpacing()
+        rows = blocks
+        if wrapwidth and self.count:
+            cols = max(1, int((wrapwidth-2*margin)/self.charWidth(font)))
+            wrapped = sum( max(1, ceil(length/cols))*n for (length, n) in self.hist.items() )
+            rows = blocks*wrapped/self.count
+        return rows*lineHeight + 2*margin
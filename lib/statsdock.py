@@ -0,0 +1,126 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Where is a slow qtail spending its time?
+#
+# readtext() reports each batch (size, time to read and decode, time to
+# insert) and this adds it up per second.  A timer that should fire
+# every 100ms measures how late it is, which is how long the event loop
+# was busy with something else (usually layout).
+#   slow producer: few small reads, idle event loop
+#   slow reader: reads take the time
+#   slow Qt: inserts take the time, or lag is high with nothing read
+
+import time
+
+from PyQt5.QtCore import QTimer
+from PyQt5.Qt import Qt
+from PyQt5.QtWidgets import QDockWidget, QWidget, QFormLayout, QLabel
+
+def human(n, unit='B'):
+    for prefix in ('', 'K', 'M', 'G'):
+        if n<1024: break
+        n /= 1024
+    return '{:1.1f} {}{}'.format(n, prefix, unit)
+
+class statsDock(QDockWidget):
+    probeInterval = 100  # mSec
+    def __init__(self, parent, textedit):
+        super().__init__(parent)
+        self.setWindowTitle('Statistics')
+        self.setObjectName('statsDock')
+        self.doc = textedit.document()
+        self.ring = None  # qtail's ring buffer, if it uses one instead
+        self.reset()
+        w = QWidget(self)
+        form = QFormLayout(w)
+        self.labels = {}
+        for (name, tip) in (
+                ('total', 'Bytes (characters from the reader thread) read since this was opened'),
+                ('rate', 'Read in the last second'),
+                ('reads', 'Batches read per second'),
+                ('size', 'Average batch size in the last second'),
+                ('read', 'Time per batch to read and decode (the reader thread decodes on its own)'),
+                ('insert', 'Time per batch to insert into the document, including trimming'),
+                ('lag', 'How late a 100ms timer was: average and worst in the last second'),
+                ('lines', 'Lines in the document'),
+                ('memory', 'Rough size of the document (text plus per line overhead)'),
+                ('runtime', 'Average run time of the command')):
+            label = QLabel('-', w)
+            label.setToolTip(tip)
+            form.addRow(name, label)
+            self.labels[name] = label
+        self.setWidget(w)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.probe = QTimer(self)
+        self.probe.setTimerType(Qt.PreciseTimer)
+        self.probe.timeout.connect(self.probed)
+        self.visibilityChanged.connect(self.running)
+
+    def reset(self):
+        self.total = 0
+        self.periodStart = time.monotonic()
+        self.bytes = self.reads = 0
+        self.readTime = self.insertTime = 0
+        self.lagSum = self.lagMax = 0
+        self.lagCount = 0
+        self.lastProbe = None
+
+    def running(self, visible):
+        # costs nothing when nobody is looking
+        if visible:
+            self.lastProbe = None
+            self.timer.start(1000)
+            self.probe.start(self.probeInterval)
+        else:
+            self.timer.stop()
+            self.probe.stop()
+
+    def batch(self, nbytes, readTime, insertTime):
+        self.total += nbytes
+        self.bytes += nbytes
+        self.reads += 1
+        self.readTime += readTime
+        self.insertTime += insertTime
+
+    def probed(self):
+        now = time.monotonic()
+        if self.lastProbe:
+            lag = max(0, now-self.lastProbe-self.probeInterval/1000)
+            self.lagSum += lag
+            self.lagMax = max(self.lagMax, lag)
+            self.lagCount += 1
+        self.lastProbe = now
+
+    def refresh(self):
+        now = time.monotonic()
+        elapsed = max(now-self.periodStart, 0.001)
+        L = self.labels
+        L['total'].setText(human(self.total))
+        L['rate'].setText(human(self.bytes/elapsed, 'B/s'))
+        L['reads'].setText('{:1.1f}/s'.format(self.reads/elapsed))
+        if self.reads:
+            L['size'].setText(human(self.bytes/self.reads))
+            L['read'].setText('{:1.2f} ms'.format(self.readTime*1000/self.reads))
+            L['insert'].setText('{:1.2f} ms'.format(self.insertTime*1000/self.reads))
+        else:
+            for name in ('size', 'read', 'insert'): L[name].setText('-')
+        if self.lagCount:
+            L['lag'].setText('{:1.1f} ms, max {:1.1f} ms'.format(self.lagSum*1000/self.lagCount, self.lagMax*1000))
+        if self.ring:
+            L['lines'].setText(str(len(self.ring)))
+            L['memory'].setText(human(self.ring.memory()))
+        else:
+            blocks = self.doc.blockCount()
+            L['lines'].setText(str(blocks))
+            # UTF-16 text plus a guess at what each block costs
+            L['memory'].setText('~'+human(self.doc.characterCount()*2+blocks*200))
+        runtime = self.parent().runtime
+        L['runtime'].setText('-' if runtime==None else '{:1.2f} s'.format(runtime))
+        # start the next period
+        self.periodStart = now
+        self.bytes = self.reads = 0
+        self.readTime = self.insertTime = 0
+        self.lagSum = self.lagMax = 0
+        self.lagCount = 0
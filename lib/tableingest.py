@@ -0,0 +1,77 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Parse the rest of a table file in a background thread
+#
+# Once tableviewer has sniffed the format from the first lines, a regular
+# file can be read as fast as the parser goes: the thread pulls rows from
+# csv.reader (or FixedWidthParser) over the open file and queues them in
+# big batches, and the GUI thread takes a batch per pass of the event
+# loop.  Like qtail's readerThread, the queue is bounded, so a fast
+# parser just waits for the GUI.
+
+import time, queue
+
+from PyQt5.QtCore import QThread
+from PyQt5.Qt import pyqtSignal
+
+class ingestThread(QThread):
+    ready = pyqtSignal()  # rows are waiting in the queue
+    eof = pyqtSignal()    # that's all of them
+    def __init__(self, rows, batch=10000, strip=True, parent=None):
+        super().__init__(parent)
+        self.rows = rows  # iterator of rows that reads the file itself, ours now
+        self.batch = batch
+        self.strip = strip  # FixedWidthParser already did
+        self.queue = queue.Queue(maxsize=16) # SETTING?
+        self.done = False
+        self.count = 0  # rows parsed so far
+
+    def stop(self):
+        self.requestInterruption()
+        self.wait()
+
+    def put(self, rows):
+        if not rows: return
+        signal = self.queue.empty()
+        while not self.isInterruptionRequested():
+            try:
+                self.queue.put(rows, timeout=0.25)
+                break
+            except queue.Full:
+                signal = True
+                self.ready.emit()
+        if signal: self.ready.emit()
+
+    def run(self):
+        rows = []
+        last = time.monotonic()
+        try:
+            for row in self.rows:
+                if row==None: continue
+                if self.strip: row = list(map(str.strip, row))
+                if row: rows.append(row)
+                self.count += 1
+                # big batches, but show the first ones soon
+                if len(rows)>=self.batch or (len(rows)%500==0 and time.monotonic()-last>0.1):
+                    if self.isInterruptionRequested(): break
+                    self.put(rows)
+                    rows = []
+                    last = time.monotonic()
+        except Exception as e:
+            print('table read failed: '+str(e)) # EXCEPT
+        self.put(rows)
+        self.done = True
+        self.eof.emit()
+
+    def take(self):
+        '''A batch of rows, [] if none are ready yet, or None when done'''
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        if self.done and self.queue.empty(): return None
+        return []
+
+    def pending(self):
+        return not self.queue.empty()
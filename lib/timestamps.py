@@ -0,0 +1,67 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Turn log line timestamps into something that sorts
+#
+# Rather than guess strptime formats, take whatever the timestamp regex
+# matched (or its ts group) and turn the numbers in it into a tuple, so
+# 2024-10-18 13:10:22.5 becomes (2024, 10, 18, 13, 10, 22, 0.5).
+# Month names become numbers and fractions of a second stay fractions.
+# Timestamps from different files only compare sensibly if they are
+# written the same way.
+
+import re
+
+# ISO 8601ish, then syslog (Oct 18 13:10:22)
+defaultRegex = r'\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:[.,]\d+)?|\b[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d\b'
+
+months = { m:i+1 for (i,m) in enumerate(
+    ['jan','feb','mar','apr','may','jun','jul','aug','sep','oct','nov','dec']) }
+
+fields = re.compile(r'[.,]\d+|\d+|[A-Za-z]+')
+
+timeOfDay = re.compile(r'(\d\d?):(\d\d)(?::(\d\d)(?:[.,](\d+))?)?')
+
+def fieldKey(ts):
+    key = []
+    for f in fields.findall(ts):
+        if f[0].isdigit():
+            key.append(int(f))
+        elif f[0] in '.,':
+            key.append(float('0.'+f[1:]))
+        else:
+            mon = months.get(f[:3].lower())
+            if mon: key.append(mon) # ignore T, Z, day names, etc.
+    return tuple(key)
+
+class timestampParser():
+    def __init__(self, regex=None):
+        self.regex = re.compile(regex or defaultRegex)
+        self.group = 'ts' if 'ts' in self.regex.groupindex else 0
+
+    def key(self, line):
+        '''Sort key for the timestamp in line, or None if it has none'''
+        m = self.regex.search(line)
+        if not m: return None
+        ts = m.group(self.group)
+        if ts==None: return None
+        return fieldKey(ts)
+
+    def target(self, text, template=None):
+        '''Key for a time the user typed: either a timestamp written like
+           the ones in the file (the end can be left off), or a time of day
+           (03:14, 03:14:15) on the day of template, which is a key from
+           the file.  None if it's neither.
+        '''
+        key = self.key(text)
+        if key: return key
+        m = timeOfDay.fullmatch(text.strip())
+        if not m: return fieldKey(text) or None
+        if not template: return None
+        # the time of day is the last three whole numbers, before any fraction
+        ints = [ i for (i,f) in enumerate(template) if isinstance(f, int) ]
+        if len(ints)<3: return None
+        key = [ int(m.group(1)), int(m.group(2)) ]
+        if m.group(3): key.append(int(m.group(3)))
+        if m.group(4): key.append(float('0.'+m.group(4)))
+        return template[:ints[-3]]+tuple(key)
@@ -0,0 +1,71 @@
+__license__   = 'GPL v3'
+__copyright__ = '2024, Steven Dick <kg4ydw@gmail.com>'
+
+# Update a qtail document to the output of a watch rerun in place
+#
+# Clearing the document and inserting everything again loses the scroll
+# position and highlights and lays out the whole thing again, which is
+# silly when a dashboard changes a line or two.  Instead diff the lines
+# of the new output against the blocks of the document (SequenceMatcher
+# hashes the lines) and only replace the blocks that changed.
+
+from difflib import SequenceMatcher
+
+from PyQt5.QtGui import QTextCursor
+
+def documentLines(doc):
+    lines = []
+    block = doc.begin()
+    while block.isValid():
+        lines.append(block.text())
+        block = block.next()
+    return lines
+
+def applyDiff(doc, text):
+    '''Make doc hold text, changing as few blocks as possible.
+       Returns the changed (start, length) ranges in the new document.
+    '''
+    old = documentLines(doc)
+    new = text.split('\n')  # the same way insertText() makes blocks
+    limit = doc.maximumBlockCount()
+    if limit>0: new = new[-limit:]  # all that inserting it would have kept
+    ops = SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+    changed = [ op for op in ops if op[0]!='equal' ]
+    if not changed: return []
+    c = QTextCursor(doc)
+    c.beginEditBlock()
+    # from the bottom up, so block numbers above stay put
+    for (tag, i1, i2, j1, j2) in reversed(changed):
+        lines = '\n'.join(new[j1:j2])
+        if tag=='insert':
+            if i1<len(old):
+                c.setPosition(doc.findBlockByNumber(i1).position())
+                c.insertText(lines+'\n')
+            else:
+                c.movePosition(QTextCursor.End)
+                c.insertText('\n'+lines)
+            continue
+        first = doc.findBlockByNumber(i1)
+        last = doc.findBlockByNumber(i2-1)
+        if tag=='replace':
+            c.setPosition(first.position())
+            c.setPosition(last.position()+last.length()-1, QTextCursor.KeepAnchor)
+            c.insertText(lines)
+        elif i2<len(old):  # delete, along with the line ends
+            c.setPosition(first.position())
+            c.setPosition(last.next().position(), QTextCursor.KeepAnchor)
+            c.removeSelectedText()
+        else:  # delete to the end, and the line end before
+            c.setPosition(max(0, first.position()-1))
+            c.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+            c.removeSelectedText()
+    c.endEditBlock()
+    # where the changes ended up
+    ranges = []
+    for (tag, i1, i2, j1, j2) in changed:
+        if j1==j2: continue
+        first = doc.findBlockByNumber(j1)
+        last = doc.findBlockByNumber(j2-1)
+        start = first.position()
+        ranges.append((start, last.position()+last.length()-1-start))
+    return ranges
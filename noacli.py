@@ -961,11 +961,15 @@ class noacli(QtWidgets.QMainWindow):
             # handle internal qtail and tableview
             if not title: title=''
             if type(args)==str: args=[args]  # --file
+            if '--merge' in outwinArgs and outwin==OutWin.QTail and len(args)>1:
+                args = [args]  # one window follows all of them
             for f in args:
                 j = jobItem(None)
                 # XXX should elide title and make a history entry or something
                 fn = f
-                if len(fn)>30:
+                if type(f)==list:
+                    fn = ' '.join(map(os.path.basename, f))
+                elif len(fn)>30:
                     fn = os.path.basename(fn) # try shortening it
                 if (title):
                     j.setTitle(title+' '+fn)
@@ -14,13 +14,14 @@ __copyright__ = '2022-2024, Steven Dick <kg4ydw@gmail.com>'
 # Doesn't handle backscrolling beyond its internal buffers
 # Currently doesn't chunk input well which causes delays and hangups
 
-import os, re, sys, time, argparse, copy, math
+import os, re, sys, time, argparse, copy, math, difflib
 from functools import partial
+from bisect import bisect_left
 from math import ceil
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtGui import QTextCursor, QFont, QTextDocument
-from PyQt5.QtWidgets import QTextEdit, QSizePolicy, QLineEdit, QActionGroup, QWidgetAction, QSpinBox, QAbstractSpinBox, QShortcut, QLabel, QStyle
+from PyQt5.QtWidgets import QTextEdit, QSizePolicy, QLineEdit, QActionGroup, QWidgetAction, QSpinBox, QAbstractSpinBox, QShortcut, QLabel, QStyle, QScrollBar, QInputDialog
 from PyQt5.QtCore import QCommandLineParser, QCommandLineOption, QIODevice, QSocketNotifier, QSize, QTimer, QProcess
 from PyQt5.Qt import Qt, pyqtSignal
 
@@ -28,13 +29,30 @@ from lib.qtail_ui import Ui_QtTail
 from lib.typedqsettings import typedQSettings
 from lib.buildsearch import buildSearch
 from lib.searchdock import searchDock
+from lib.bigfile import lineIndex, tailOffset, linesFrom, timeOffset
+from lib.qtailio import readerThread, newDecoder
+from lib.searchengine import searchThread, toRegex
+from lib.highlightstore import highlightStore
+from lib.sizeestimate import sizeEstimator
+from lib.ansi import ansiParser
+from lib.richstream import richStream
+from lib.watchdiff import applyDiff
+from lib.runhistory import runHistory
+from lib.statsdock import statsDock
+from lib.ringbuffer import lineRing
+from lib.ringview import ringView
+from lib.qtailmerge import mergeReader
+from lib import timestamps
+from lib import highlightsets
 
 # XXX some options not implemented yet
 # XXX no option editor for stand alone qtail
 typedQSettings().registerOptions({
     'QTailDelaySearch':[250, 'delay (mSec) while typing before a search is triggered', int],
     'QTailMaxLines': [ 10000, 'maximum lines remembered in a qtail window', int],
-    'QTailReadBlock':[8192, 'Maximum block size to read at once (higher for more performance but lower responsiveness)', int],
+    'QTailReadBlock':[8192, 'Starting block size to read at once, adjusted to fit QTailReadBudget', int],
+    'QTailMaxReadBlock':[1024*1024, 'Maximum block size qtail will grow to while data keeps arriving', int],
+    'QTailReadBudget':[40, 'Time (mSec) qtail aims to spend reading and inserting each block', int],
     'QTailEndBytes': [ 1024*1024, 'Number of bytes qtail rewinds a file', int],
     'QTailDefaultTitle': [ 'subprocess', 'Default title for a qtail process window', str ],
     'QTailDelayResize':[ 3, 'Resize qtail to fit output again seconds after first input arrives', int],
@@ -48,6 +66,14 @@ typedQSettings().registerOptions({
    #'QTailSearchMode': ['exact', 'exact or regex search mode', str],
    #'QTailCaseInsensitive': [True, 'Ignore case when searching', bool],
     'QTailWatchInterval': [30, "Default automatic refresh interval for qtail in watch mode", int],
+    'QTailWatchDiff': [True, 'When a watched command is rerun, only update the lines that changed instead of starting over', bool],
+    'QTailWatchHighlight': [True, 'Highlight lines that changed since the last watch rerun', bool],
+    'QTailWatchHistory': [4096, 'Memory (KB) qtail uses to keep the compressed output of past watch runs, 0 for none', int],
+    'QTailReaderThread': [True, 'Read files and stdin in a background thread so slow reads never block the qtail window', bool],
+    'QTailPollInterval': [1.0, 'Seconds between checks of a followed file for growth, truncation and rotation', float],
+    'QTailTimestampRegex': [timestamps.defaultRegex, 'Regular expression for the timestamp qtail --merge sorts lines by and Go to time searches for (a group named ts is used if there is one)', str],
+    'QTailRingView': [False, 'Keep plain text in a compact ring buffer shown by a lightweight view instead of a text document (no highlights or find all, but millions of lines are cheap)', bool],
+    'QTailWindowLines': [2000, 'Number of lines of a --whole file kept in the qtail window at once', int],
     'colorlist': [None, "Default list of colors to use for highlighting", str],
 })    
 
@@ -65,8 +91,9 @@ class softArgumentParser(argparse.ArgumentParser):
 class myOptions():
     def __init__(self):
         self.maxLines = 10000
-        self.tailFrag = 1000*1000
-        # note: maxLines*80 is close to tailFrag
+        self.tailFrag = 1000*1000  # rewind this far if there's no line limit
+        self.tailCap = False  # -c given: never rewind further than tailFrag
+        self.sleep = None  # file polling interval, default from settings
         self.isCommand = False
         self.file = False
         self.whole = False
@@ -83,16 +110,21 @@ class myOptions():
         #XX parser.add_argument("--command",help="view output from command", action='store_true')
 
         ## copy some options from tail, but not exactly
-        parser.add_argument('-c', '--bytes', type=int, metavar='bytes', help='maximum size of tail chunk in bytes', dest='tailFrag', default=self.tailFrag)
+        parser.add_argument('-c', '--bytes', type=int, metavar='bytes', help='maximum size of tail chunk in bytes', dest='tailFrag', default=None)
         parser.add_argument('-n', '--lines', help='keep the last NUM lines', metavar='NUM', type=int, default=self.maxLines)
+        parser.add_argument('-s', '--sleep', type=float, metavar='seconds', help='check a followed file for changes this often', default=None)
         parser.add_argument('--whole', '-w', help='look at the whole file, not just the tail', action='store_true')
         parser.add_argument('-t','--title', help='set window title if a filename is not supplied',metavar='title')
-        parser.add_argument('--format', help='Pick a format (plaintext, html)', choices=['plaintext','html', 'markdown', 'ansi','md', 'p','h','m','a'], metavar='format', default='plaintext') # XX markdown doesn't work
+        parser.add_argument('--format', help='Pick a format (plaintext, html, markdown, ansi)', choices=['plaintext','html', 'markdown', 'ansi','md', 'p','h','m','a'], metavar='format', default='plaintext')
         parser.add_argument('--url', help='Read input from a url or filename and autodetect format', action='store_true')
         parser.add_argument('--nowrap', help="Disable word wrap by default", action='store_true') # set in start()
         parser.add_argument('--autorefresh', '--auto', nargs='?', type=int, metavar='seconds', const=0, help='Enable autorefresh and (optionally) set refresh interval')
         parser.add_argument('--watch', action='store_true', help='Enable watch')
         parser.add_argument('--findall', help='Search for a regular expression at start', type=str, default=None, metavar='regex')
+        parser.add_argument('--highlight', help='Apply a saved highlight set', type=str, default=None, metavar='name')
+        parser.add_argument('--ring', help='Keep lines in a ring buffer view (plain text only, fast with huge --lines)', action='store_true')
+        parser.add_argument('--merge', help='Follow all the files in one window, lines merged by timestamp', action='store_true')
+        parser.add_argument('--timestamp', help='Regular expression for the timestamp --merge sorts by', type=str, default=None, metavar='regex')
         parser.add_argument('--font','-F', help='Select font from list (1,2) or set font by name', type=str, default=None, metavar='font')
 
         parser.add_argument('filename', nargs=argparse.REMAINDER)
@@ -102,7 +134,7 @@ class myOptions():
         # --retry
         # --max-unchanged-status (a timeout would be better)
         # --pid
-        # -s --sleep  (for stat and pid polling)
+        # -s --sleep  (for pid polling too)
         ## other possible options
         # --timeout-unchanged (reopen or quit on timeout)
         # --timeout-reopen
@@ -122,16 +154,18 @@ class myOptions():
         ## this might be called late, so apply settings as we go
         # XX future: refactor to use self namespace and do less checking
         # self.isCommand = parser.command # XX not implemented yet
-        if args.tailFrag > 100: self.tailFrag = args.tailFrag
+        if args.tailFrag and args.tailFrag > 100:
+            self.tailFrag = args.tailFrag
+            self.tailCap = True
         self.maxLines = args.lines
+        if args.sleep and args.sleep>0: self.sleep = args.sleep
         self.whole = args.whole
         if self.whole:
             self.maxLines = 0
-            args.nowrap = True
         if args.title: self.title=args.title # XX late apply?
         if args.format:
-            if args.format=='html': self.format='h'
-            elif args.format in ('markdown', 'md', 'm'): self.format='m' # XX
+            if args.format in ('html', 'h'): self.format='h'
+            elif args.format in ('markdown', 'md', 'm'): self.format='m'
             elif args.format in ('ansi', 'a'): self.format='a'
             else: self.format=None
         if args.url: self.url = True
@@ -150,10 +184,23 @@ class QtTail(QtWidgets.QMainWindow):
         self.findcount = 0
         self.timestart = time.monotonic() # in case we miss the real start
         self.runtime = None
-        self.disableAdjustSize = False
         self.eof = 0 # hack
         self.buttonCon = None
         self.highlightDock = None
+        self.bigfile = None  # line index for --whole on huge files
+        self.winStart = 0
+        self.winOffset = 0  # byte offset of the window when winStart is unknown
+        self.winBusy = False
+        self.reader = None  # background reader thread
+        self.findThread = None  # background findAll
+        self.hlset = None  # active highlight set
+        self.hlThread = None
+        self.decoder = newDecoder()
+        self.readBlock = None  # adaptive read size
+        self.wantTime = None
+        self.rateStart = time.monotonic()
+        self.rateBytes = 0
+        self.rate = 0
         dir = os.path.dirname(os.path.realpath(__file__))
         icon = QtGui.QIcon(os.path.join(dir,'icons', 'qtail.png'))
         if icon.isNull() or len(icon.availableSizes())<1: # try again
@@ -163,6 +210,11 @@ class QtTail(QtWidgets.QMainWindow):
         # connect to my own event so I can send myself a delayed signal
         self.want_resize.connect(self.actionAdjust, Qt.QueuedConnection) # delay this
         self.want_read_more.connect(self.readtext, Qt.QueuedConnection) # read more after everything else is updated
+        # resize again once some more has arrived (dies with the window, unlike singleShot)
+        self.resizeTimer = QTimer(self)
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.setTimerType(Qt.VeryCoarseTimer)
+        self.resizeTimer.timeout.connect(self.actionAdjust)
 
         if options==None:
             options=myOptions()
@@ -177,10 +229,19 @@ class QtTail(QtWidgets.QMainWindow):
         self.textbody = self.ui.textBrowser
         if self.opt.maxLines>0:
             self.textbody.document().setMaximumBlockCount(self.opt.maxLines)
-        else:
-            self.disableAdjustSize = True  # too expensive for huge text
-            self.ui.actionAdjust.setEnabled(False)
+        self.sizer = sizeEstimator(self.textbody.document())
+        self.ansi = None  # for --format=ansi
+        self.rich = None  # for --format=html or markdown
+        self.rerunText = None  # output of a watch rerun, to diff at the end
+        self.runs = runHistory()  # past watch runs
+        self.runShown = None  # index of the past run on display, None for live
+        self.runWindows = []  # comparisons, so they don't get collected
+        self.stats = None  # statistics dock
+        self.ringview = None  # lightweight view of a lineRing, instead of the document
         self.textbody.cursorPositionChanged.connect(self.findSelection)
+        self.highlights = highlightStore(self.textbody)
+        self.highlights.setFormat('user', QtGui.QBrush(Qt.yellow)) # SETTING XXX
+        self.highlights.setFormat('changed', QtGui.QBrush(QtGui.QColor('#c0ffc0'))) # SETTING XXX
 
         ## build the Mode menu because QtDesigner can't do it
         m = self.ui.menuMode
@@ -198,6 +259,17 @@ class QtTail(QtWidgets.QMainWindow):
         wa = QWidgetAction(m)
         wa.setDefaultWidget(line)
         m.addAction(wa)
+        a = m.addAction('Highlight changes')
+        a.setCheckable(True)
+        a.setChecked(typedQSettings().value('QTailWatchHighlight', True))
+        a.setToolTip('Highlight lines that changed since the last rerun')
+        a.toggled.connect(self.watchHighlightChanged)
+        self.ui.actionHighlightChanges = a
+        m.addSeparator()
+        m.addAction('Previous run', partial(self.stepRun, -1))
+        m.addAction('Next run', partial(self.stepRun, 1))
+        m.addAction('Latest run', partial(self.stepRun, None))
+        m.addAction('Compare runs...', self.compareRuns)
         ### can't do this yet
         #if type(self.file)!=QProcess: # can't watch a non-process
         #    self.ui.actionWatch.setEnabled(False) 
@@ -206,13 +278,26 @@ class QtTail(QtWidgets.QMainWindow):
         self.findTimer = QTimer(self)
         self.findTimer.timeout.connect(self.simpleFindNewTimer)
         self.findTimer.setSingleShot(True)
+        self.changeTimer = QTimer(self)
+        self.changeTimer.setSingleShot(True)
+        self.changeTimer.timeout.connect(self.fileChangedLater)
         # note: this intentionally doesn't refresh on settings change
         self.reinterval = typedQSettings().value('QTailWatchInterval',20)
         # find
         self.editorShortcut = QShortcut(QtGui.QKeySequence('ctrl+f'), self)
         self.editorShortcut.activated.connect(self.ui.searchTerm.setFocus)
 
+        # canned highlight sets
+        self.ui.menuSearch.addAction('Next highlight', self.nextHighlight)
+        self.ui.menuSearch.addAction('Previous highlight', partial(self.nextHighlight, False))
+        m = self.ui.menuSearch.addMenu('Highlight sets')
+        m.aboutToShow.connect(partial(self.buildHighlightMenu, m))
+
         m = self.ui.menuView
+        m.addAction('Go to line...', self.goToLine)
+        m.addAction('Go to time...', self.goToTime)
+        m.addAction('Go to offset...', self.goToOffset)
+        m.addAction('Statistics', self.showStats)
         primary = self.getFontSetting('QTailPrimaryFont')
         if primary:
             m.addAction(primary.toString(),partial(self.ui.textBrowser.document().setDefaultFont, primary))
@@ -234,7 +319,7 @@ class QtTail(QtWidgets.QMainWindow):
 
     def deleteClosedSearches(self):
         skip = 0
-        docks = self.findChildren(QtWidgets.QDockWidget)
+        docks = self.findChildren(searchDock)
         for dock in docks:
             if dock.isVisible():
                 #print("skip visible {}".format(dock.windowTitle())) # DEBUG
@@ -251,7 +336,7 @@ class QtTail(QtWidgets.QMainWindow):
     def showClosedSearches(self):
         # both show and tabify them all
         prev = None
-        docks = self.findChildren(QtWidgets.QDockWidget)
+        docks = self.findChildren(searchDock)
         # XX does this break if they're already tabified?
         for dock in sorted(docks, key=lambda d: d.windowTitle()):
             dock.show()
@@ -288,7 +373,7 @@ class QtTail(QtWidgets.QMainWindow):
         else: 
             ## XX distinguish between stdin and a file eventually (seekable?)
             # print(type(self.file), self.filename, hasattr(self, 'filename')) # DEBUG
-            if hasattr(self,'filename') and self.ui.actionWatch.isChecked():
+            if (hasattr(self,'filename') or hasattr(self,'filenames')) and self.ui.actionWatch.isChecked():
                 self.rebutton('Reload',self.reload)
             else:
                 self.rebutton('Close', self.close,'modefile')
@@ -335,6 +420,7 @@ class QtTail(QtWidgets.QMainWindow):
         self.updateStatusIcon()
             
     def reloadOrRerun(self):
+        if not hasattr(self, 'file'): return  # just text (compare runs), no source
         # XX reset and restart timer if this was user triggered?
         self.firstRead = False  # don't trigger resize if button pushed
         # XXX on reload maybe cancel resize timer too?
@@ -343,7 +429,13 @@ class QtTail(QtWidgets.QMainWindow):
             if self.file.state()==QProcess.Running:  # it's taking a long time
                 return
             else:
-                self.ui.textBrowser.clear()
+                if typedQSettings().value('QTailWatchDiff', True) and not self.opt.format and not self.ringview:
+                    # keep the old output until the new one can be compared
+                    self.rerunText = []
+                else:
+                    self.clearText()
+                    self.runShown = None
+                self.decoder = newDecoder()
                 #if typedQSettings().value('DEBUG',False): print('rerun '+(" ".join(self.file.arguments()))) # DEBUG
                 self.file.start()
         else:
@@ -351,6 +443,12 @@ class QtTail(QtWidgets.QMainWindow):
             
     def closeEvent(self,event):
         self.timer.stop()  # restart this on reopen?
+        if self.bigfile:
+            self.leaveBigFile()
+        if self.reader:
+            self.reader.stop()
+        self.cancelFindAll()
+        self.cancelHighlightSet()
         self.window_close_signal.emit()
         super().closeEvent(event)
 
@@ -361,29 +459,23 @@ class QtTail(QtWidgets.QMainWindow):
 
     @QtCore.pyqtSlot()
     def clearFinds(self):
-        self.textbody.setExtraSelections([])
+        self.cancelHighlightSet()
+        self.hlset = None
+        self.highlights.clear()
+        for dock in self.findChildren(searchDock):
+            dock.shown = False
         
     def saveHighlight(self, user=True):
         start = self.textbody.textCursor()
         if start.hasSelection():
-            ess = self.textbody.extraSelections()
-            e=None
-            for e in ess:
-                if e.cursor.anchor()==start.anchor():
-                    break
-            if e and e.cursor.anchor()==start.anchor():
-                e.cursor = start  # in case selection changed
-            else: # make a new one
-                es = QTextEdit.ExtraSelection()
-                es.format.setBackground(QtGui.QBrush(Qt.yellow)) # SETTING XXX
-                es.cursor = start
-                ess.append(es)
-                self.textbody.setExtraSelections(ess)
+            # replaces one that starts at the same place, in case selection changed
+            self.highlights.insert(start.selectionStart(), start.selectionEnd()-start.selectionStart(), 'user')
             if user and self.highlightDock:
                 self.highlightDock.addSel(start)
         
     @QtCore.pyqtSlot(str)
     def simpleFind(self, text):
+        if self.ringview: return self.ringFind(text)
         start = self.textbody.textCursor()
         # remember previous find
         self.saveHighlight(False)
@@ -401,8 +493,7 @@ class QtTail(QtWidgets.QMainWindow):
             return
         if success:
             self.findcount += 1
-            es = self.textbody.extraSelections()
-            self.statusBar().showMessage('Found {}/{}'.format(self.findcount, len(es)))
+            self.statusBar().showMessage('Found {}/{}'.format(self.findcount, len(self.highlights)))
         else:
             # try again
             cursor = self.textbody.textCursor()
@@ -411,9 +502,7 @@ class QtTail(QtWidgets.QMainWindow):
             success = self.textbody.find(searchterm, findflags)
             if success:
                 if self.findcount:
-                    m = 'Wrapped after {}/{}'.format(self.findcount,len(self.textbody.extraSelections()))
-                    es = self.textbody.extraSelections()
-                    cs = sorted([e.cursor for e in es])
+                    m = 'Wrapped after {}/{}'.format(self.findcount,len(self.highlights))
                 else:
                     m = 'Wrapped'
                 self.statusBar().showMessage(m)
@@ -427,6 +516,7 @@ class QtTail(QtWidgets.QMainWindow):
     def simpleFindNew(self, text):
         delay = typedQSettings().value('QTailDelaySearch', 200)
         self.findcount = 0
+        self.cancelFindAll() # new search term, forget the old one
         if not delay:
             self.simpleFind(text)
         else:
@@ -444,35 +534,81 @@ class QtTail(QtWidgets.QMainWindow):
 
     @QtCore.pyqtSlot()
     def readtext(self, fromwhere='unk'):
-        blocksize = typedQSettings().value('QTailReadBlock',1024)
-        b = self.file.read(blocksize)
-        # b = None?  b=0? b<blocksize?  b==blocksize?
-        #print(type(b),len(b), self.file.atEnd()) # DEBUG
+        if self.bigfile: return  # left over from before going to the whole file
+        qs = typedQSettings()
+        minblock = max(256, qs.value('QTailReadBlock',8192))
+        if not self.readBlock: self.readBlock = minblock
+        blocksize = self.readBlock
+        passstart = time.monotonic()
+        budget = qs.value('QTailReadBudget',40)/1000
+        if fromwhere=='more' and self.wantTime:
+            # how long did the event loop take to get back to us?
+            lag = passstart-self.wantTime
+            self.wantTime = None
+        else:
+            lag = 0
+        if self.reader:
+            # the reader thread already decoded it
+            t = self.reader.take(blocksize)
+            if t==None:  # reader is done and we have it all
+                t = ''
+                if self.eof<=2 and not hasattr(self, 'filename'):
+                    self.rebutton('Close', self.close,'reader eof')
+                self.eof = 6
+            b = t
+            more = self.reader.pending()
+        else:
+            b = self.file.read(blocksize)
+            # b = None?  b=0? b<blocksize?  b==blocksize?
+            #print(type(b),len(b), self.file.atEnd()) # DEBUG
+            #print('read {}: {}'.format(fromwhere,len(b))) # DEBUG
+            if b==None: # already got EOF (probably?)
+                #if typedQSettings().value('DEBUG',False):print("EOF from "+fromwhere)
+                self.eof = 6
+            if b==None or len(b)==0:  # EOF hack, probably has race conditions
+               if self.eof > 2 and hasattr(self,'notifier'):
+                  # this gets false positives for QProcess (which doesn't set notifier
+                  # but seems to be OK with file and stdin
+                  self.notifier.setEnabled(False)  # stop looking for more
+                  self.rebutton('Close', self.close,'eof={}'.format(self.eof))
+            t = ''
+            if b: t = self.decoder.decode(b)
+            more = b and len(b)==blocksize and not self.file.atEnd()
+        readDone = time.monotonic()
+        if self.rerunText!=None:
+            # watch rerun, wait for all of it (see applyRerun)
+            if t: self.rerunText.append(t)
+            if more: self.want_read_more.emit('more')
+            return
         e = self.textbody.textCursor()
         e.movePosition(QtGui.QTextCursor.End)
-        #print('read {}: {}'.format(fromwhere,len(b))) # DEBUG
-        if b==None: # already got EOF (probably?)
-            #if typedQSettings().value('DEBUG',False):print("EOF from "+fromwhere)
-            self.eof = 6
-        if b==None or len(b)==0:  # EOF hack, probably has race conditions
-           if self.eof > 2 and hasattr(self,'notifier'):
-              # this gets false positives for QProcess (which doesn't set notifier
-              # but seems to be OK with file and stdin
-              self.notifier.setEnabled(False)  # stop looking for more
-              self.rebutton('Close', self.close,'eof={}'.format(self.eof))
         if b and len(b)>0:
             self.eof = 0
-            t = b.decode('utf-8', errors='backslashreplace')
             # self.textbody.append(t)  # append adds an extra paragraph separator
             #self.endcursor.insertText(t)
-            if self.opt.format=='h':  e.insertHtml(t)
-            #WTF# elif self.opt.format=='m': e.insertMarkdown(t)
-            else: e.insertText(t)
+            if self.ringview:
+                self.ringview.appended(self.ringview.ring.append(t), self.ui.followCheck.isChecked())
+                self.sizer.add(t)
+            elif self.opt.format in ('h', 'm'):
+                self.insertRich(e, t)
+                self.sizer.reset()  # sample the rendered text later
+            elif self.opt.format=='a':
+                self.sizer.add(self.insertAnsi(e, t))
+            else:
+                e.insertText(t)
+                self.sizer.add(t)
             if self.ui.followCheck.isChecked():
                 self.textbody.setTextCursor(e)
-        if b and len(b)==blocksize and not self.file.atEnd():
+            self.updateLiveSearches()
+            self.updateHighlightSet()
+            self.adaptReadBlock(len(b), time.monotonic()-passstart, lag, budget, minblock)
+        if self.stats and b:
+            now = time.monotonic()
+            self.stats.batch(len(b), readDone-passstart, now-readDone)
+        if more:
+            self.wantTime = time.monotonic()
             self.want_read_more.emit('more')
-        if self.firstRead and (self.eof>2 or e.position()>200 or self.textbody.document().blockCount()>10): # SETTING threshold
+        if self.firstRead and (self.eof>2 or e.position()>200 or self.textbody.document().blockCount()>10 or (self.ringview and len(self.ringview.ring)>10)): # SETTING threshold
             # if never resized, resize at eof or 200 bytes or 10 lines
             # XXX but maybe not if there's more to read immediately??
             self.firstRead=False
@@ -481,12 +617,109 @@ class QtTail(QtWidgets.QMainWindow):
             rdelay = typedQSettings().value('QTailDelayResize',3)
             if b and rdelay:
                 #if typedQSettings().value('DEBUG',False):print("set timer to "+str(rdelay)) # DEBUG
-                QTimer.singleShot(int(rdelay)*1000, Qt.VeryCoarseTimer, self.actionAdjust)
+                self.resizeTimer.start(int(rdelay)*1000)
         self.showsize(False)
 
+    def insertRich(self, cursor, text):
+        if not self.rich:
+            self.rich = richStream(self.textbody.document(), self.opt.format)
+        self.rich.insert(cursor, text)
+
+    def insertAnsi(self, cursor, text):
+        if not self.ansi:
+            pal = self.textbody.palette()
+            self.ansi = ansiParser(pal.text().color(), pal.base().color())
+        if cursor.position()==0:
+            self.ansi.reset()  # starting over
+        # one edit, or the text edit reacts to every run
+        cursor.beginEditBlock()
+        text = self.ansi.insert(cursor, text)
+        cursor.endEditBlock()
+        return text
+
+    def adaptReadBlock(self, nbytes, elapsed, lag, budget, minblock):
+        # grow the block while data keeps coming and we're under budget,
+        # shrink it if inserting or the rest of the UI got slow
+        maxblock = max(minblock, typedQSettings().value('QTailMaxReadBlock',1024*1024))
+        # (trimming to QTailMaxLines costs about the same for any size block,
+        # so bigger blocks are much cheaper per byte up to a point)
+        if elapsed>budget*2 or lag>budget*2:
+            self.readBlock = max(minblock, self.readBlock//2)
+        elif nbytes>=self.readBlock and elapsed<budget:
+            self.readBlock = min(maxblock, self.readBlock*2)
+        # keep a running rate for the status bar
+        now = time.monotonic()
+        self.rateBytes += nbytes
+        if now-self.rateStart>=1:
+            self.rate = self.rateBytes/(now-self.rateStart)
+            self.rateStart = now
+            self.rateBytes = 0
+
+    def rateText(self):
+        # only interesting while data is flowing
+        if time.monotonic()-self.rateStart>2 or self.rate<1024: return ''
+        r = self.rate
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if r<1024: break
+            r /= 1024
+        return ', {:1.1f} {}/s'.format(r, unit)
+
     # @QtCore.pyqtSlot(str)
+    def pollInterval(self):
+        if self.opt.sleep: return self.opt.sleep
+        return max(0.05, typedQSettings().value('QTailPollInterval', 1.0))
+
     def filechanged(self, path):
+        # the watcher forgets files that are renamed or deleted
+        if hasattr(self, 'watcher') and path not in self.watcher.files() and os.path.exists(path):
+            self.watcher.addPath(path)
+        if self.bigfile:
+            if not self.bigfile.grow():
+                self.statusBar().showMessage('{} was truncated or replaced'.format(path))
+                self.showWindow(0)
+            return
+        if self.reader:
+            self.reader.wake()
+            return
+        # a burst of notifications only needs one read (which reads to eof)
+        if not self.changeTimer.isActive():
+            self.changeTimer.start(0)
+
+    def fileChangedLater(self):
+        if self.file and hasattr(self, 'filename'):
+            self.followRotation()  # and carry on like tail -F
         self.readtext('changed')
+
+    def followRotation(self):
+        # tail -F without the reader thread: returns true if starting over
+        try:
+            st = os.stat(self.filename)
+            cur = os.fstat(self.file.handle())
+        except OSError:
+            return False  # gone for now
+        if (st.st_ino, st.st_dev)!=(cur.st_ino, cur.st_dev):
+            if not self.file.atEnd():
+                return False  # finish the old one first, switch next time
+            f = QtCore.QFile(self.filename)
+            if not f.open(QtCore.QFile.ReadOnly): return False
+            self.file.close()
+            self.file = f
+            self.decoder = newDecoder()
+            self.fileReopened('{} was replaced, following new file'.format(self.filename))
+            return True
+        if st.st_size<self.file.pos():
+            self.file.seek(0)
+            self.decoder = newDecoder()
+            self.fileReopened('{} was truncated'.format(self.filename))
+            return True
+        return False
+
+    def fileReopened(self, message):
+        self.statusBar().showMessage(message)
+        if not hasattr(self, 'watcher'): return
+        for f in getattr(self, 'filenames', [self.filename]):
+            if f not in self.watcher.files() and os.path.exists(f):
+                self.watcher.addPath(f)
     # @QtCore.pyqtSlot(QSocketDescriptor, QsocketNotifier.Type)
     def socketActivated(self, socket):
         # XXX detect eof here???
@@ -495,6 +728,8 @@ class QtTail(QtWidgets.QMainWindow):
     def start(self):
         doc = self.textbody.document()
         doc.setMaximumBlockCount(self.opt.maxLines)
+        if self.wantRing() and not self.ringview:
+            self.startRing()
         # set defaults before processing cli options
         qs = typedQSettings()
         ww = qs.value('QTailWordWrap', False)
@@ -515,6 +750,8 @@ class QtTail(QtWidgets.QMainWindow):
             if self.opt.argparse.findall:
                 # this only seems to work after being triggered or at eof
                 self.findallConnection = self.ui.textBrowser.sourceChanged.connect(self.triggerFindAll)
+            if self.opt.argparse.highlight:
+                self.applyHighlightSet(self.opt.argparse.highlight)
             if self.opt.argparse.font:
                 if self.opt.argparse.font=='1':
                     primary = self.getFontSetting('QTailPrimaryFont')
@@ -528,6 +765,76 @@ class QtTail(QtWidgets.QMainWindow):
                     # else: silently fail
                     
 
+    def wantRing(self):
+        if self.opt.format or self.opt.whole or self.opt.url: return False
+        if hasattr(self.opt, 'argparse') and self.opt.argparse.ring: return True
+        return typedQSettings().value('QTailRingView', False)
+
+    def startRing(self):
+        # swap the text edit for a ring view, the document stays empty
+        self.ringview = ringView(lineRing(self.opt.maxLines), self)
+        self.ringview.setFont(self.textbody.document().defaultFont())
+        lay = self.ui.verticalLayout
+        lay.insertWidget(lay.indexOf(self.textbody), self.ringview)
+        self.textbody.hide()
+        self.ui.followCheck.toggled.connect(self.ringview.jumpToEndMaybe)
+        if self.stats: self.stats.ring = self.ringview.ring
+
+    def noWrapWhole(self):
+        # all of a --whole stream goes in the document, wrapping it all hangs
+        # (regular files only keep a window, see openBigFile)
+        if self.opt.whole and not self.ringview:
+            self.ui.actionWrap_lines.setChecked(False)
+            self.wrapChanged(False)
+
+    def clearText(self):
+        self.textbody.clear()
+        if self.ringview: self.ringview.clear()
+
+    def notInRing(self, what):
+        # the ring view has no document for these to work on
+        if not self.ringview: return False
+        self.statusBar().showMessage(what+' is not available in the ring view')
+        return True
+
+    def ringFind(self, text):
+        searchterm = buildSearch(text, self.ui)
+        if not searchterm:
+            return
+        if isinstance(searchterm, str):
+            pattern = re.escape(searchterm)
+        else:
+            pattern = searchterm.pattern()
+        if self.ui.actionWholeWords.isChecked():
+            pattern = r'\b(?:' + pattern + r')\b'
+        flags = re.M
+        if self.ui.actionCaseInsensitive.isChecked(): flags |= re.I
+        try:
+            regex = re.compile(pattern.encode('utf-8'), flags)
+        except re.error as e:
+            self.statusBar().showMessage('Bad regex: {}'.format(e))
+            return
+        view = self.ringview
+        if view.hit:
+            (line, col) = (view.hit[0], view.hit[1]+1)
+        else:
+            (line, col) = (view.topLine(), 0)
+        hit = view.ring.find(regex, line, col)
+        if hit:
+            self.findcount += 1
+            self.statusBar().showMessage('Found {}'.format(self.findcount))
+        else:
+            hit = view.ring.find(regex, 0)
+            if hit:
+                if self.findcount:
+                    self.statusBar().showMessage('Wrapped after {}'.format(self.findcount))
+                else:
+                    self.statusBar().showMessage('Wrapped')
+                self.findcount = 1
+            else:
+                self.statusBar().showMessage('Not found')
+        view.showHit(hit)
+
     def triggerFindAll(self, url):
         d= self.findAll(self.opt.argparse.findall)
         # don't trigger more than once
@@ -538,7 +845,27 @@ class QtTail(QtWidgets.QMainWindow):
         m = self.statusBar().currentMessage()
         if m and not replace and 'lines' not in m:
             return
-        self.statusBar().showMessage(str(self.textbody.document().blockCount())+" lines",-1)
+        if self.bigfile and self.winStart==None:
+            msg = 'bytes {}- of {} (lines not counted this far yet)'.format(self.winOffset, self.bigfile.size)
+            self.statusBar().showMessage(msg,-1)
+            return
+        if self.bigfile:
+            top = self.winStart+1
+            total = self.bigfile.lines()
+            doc = self.textbody.document()
+            count = doc.blockCount()
+            if count>1 and not doc.lastBlock().text():
+                count -= 1  # after the last newline, not a line
+            bottom = min(self.winStart+count, total)
+            msg = "lines {}-{} of {}".format(top, bottom, total)
+            if not self.bigfile.complete(): msg += ' (indexing)'
+            self.statusBar().showMessage(msg,-1)
+            return
+        if self.ringview:
+            lines = len(self.ringview.ring)
+        else:
+            lines = self.textbody.document().blockCount()
+        self.statusBar().showMessage(str(lines)+" lines"+self.rateText(),-1)
 
     def simpleargs(self, args):
         # Process simple "command line" arguments from noacli internal parsing
@@ -568,9 +895,6 @@ class QtTail(QtWidgets.QMainWindow):
     def openfile(self,filename):
         self.filename = filename # reuse later?
         self.start()
-        if self.opt.format=='m':
-            self.openMarkdownFile(filename)
-            return
         if self.opt.url:
             # bypass normal file I/O and let Qt do it
             self.file = None
@@ -596,40 +920,336 @@ class QtTail(QtWidgets.QMainWindow):
             title=filename
             if len(title)>30: title=os.path.basename(title)
             self.setWindowTitle(title)
-        self.reload();
+        if self.opt.whole and not self.opt.format and not f.isSequential():
+            # huge files are mapped instead of read
+            f.close()
+            self.file = None
+            self.openBigFile(filename)
+        else:
+            self.noWrapWhole()
+            self.reload();
         
         # follow the tail of the file
         self.watcher = QtCore.QFileSystemWatcher([filename])
         self.watcher.fileChanged.connect(self.filechanged)
+        if not self.reader:
+            # the reader thread polls by itself, otherwise stat it now and then
+            self.pollTimer = QTimer(self)
+            self.pollTimer.timeout.connect(partial(self.filechanged, filename))
+            self.pollTimer.start(int(self.pollInterval()*1000))
+        if self.bigfile: return
         self.endcursor = self.textbody.textCursor()
         self.endcursor.movePosition(QtGui.QTextCursor.End)
         self.textbody.setTextCursor(self.endcursor)
-    
-    def openMarkdownFile(self, filename):
-        # Qt textBrowser doesn't support appending to markdown so...
-        # we break all the rules for this one
-        #self.opt.format = 'm'
-        self.filename = filename
-        self.file = None
+
+    ### --merge: several files followed in one window, always with reader threads
+    def openMerged(self, filenames):
+        self.filenames = filenames
+        self.start()
+        self.timestampRegex = self.getTimestampRegex()
         try:
-            f = open(filename)
-            # XXX set filename and flag as markdown?
-            text = f.read()
-        except OSError:
+            re.compile(self.timestampRegex or timestamps.defaultRegex)
+            self.reloadMerged()
+        except (OSError, re.error) as e:
+            if isinstance(e, OSError):
+                err = 'Open failed on {}: {}'.format(e.filename, e.strerror)
+            else:
+                err = 'Bad timestamp regex: {}'.format(e)
+            print(err) # EXCEPT
+            self.close()
+            self.deleteLater()
+            raise Exception(err)
+        if not self.opt.title:
+            self.setWindowTitle('merge: '+' '.join(map(os.path.basename, filenames)))
+        self.opt.file = True
+        self.watcher = QtCore.QFileSystemWatcher(filenames)
+        self.watcher.fileChanged.connect(self.filechanged)
+        self.setButtonMode()
+
+    def getTimestampRegex(self):
+        regex = None
+        if hasattr(self.opt, 'argparse'): regex = self.opt.argparse.timestamp
+        return regex or typedQSettings().value('QTailTimestampRegex', None)
+
+    def reloadMerged(self):
+        offsets = []
+        cap = None
+        if self.opt.tailCap: cap = self.opt.tailFrag
+        for f in self.filenames:
+            fd = os.open(f, os.O_RDONLY)
+            try:
+                if self.opt.whole:
+                    off = 0
+                elif self.opt.maxLines>0:
+                    # each file gets to fill the window, the document trims the rest
+                    off = tailOffset(fd, self.opt.maxLines, cap)
+                else:
+                    off = max(0, os.fstat(fd).st_size-self.opt.tailFrag)
+            finally:
+                os.close(fd)
+            offsets.append(off)
+        if self.reader:
+            self.reader.stop()
+        self.clearText()
+        self.reader = mergeReader(self.filenames, offsets, self.timestampRegex, self.pollInterval(), parent=self)
+        self.reader.ready.connect(partial(self.readtext, 'reader'))
+        self.reader.eof.connect(partial(self.readtext, 'eof'))
+        self.reader.reopened.connect(self.fileReopened)
+        self.reader.start()
+
+    ### --whole on a regular file: only a window of lines is in the document
+    def openBigFile(self, filename):
+        try:
+            self.bigfile = lineIndex(filename, parent=self)
+        except OSError as e:
+            print('Open failed on {}: {}'.format(filename, e.strerror)) # EXCEPT
             self.close()
-            self.setParent(None)
+            self.deleteLater()
             raise
+        self.bigfile.progress.connect(self.bigProgress)
+        # put a scroll bar for the whole file beside the window
+        tb = self.textbody
+        lay = self.ui.verticalLayout
+        i = lay.indexOf(tb)
+        lay.removeWidget(tb)
+        box = QtWidgets.QHBoxLayout()
+        box.setSpacing(0)
+        box.addWidget(tb)
+        self.bigScroll = QScrollBar(Qt.Vertical, self)
+        self.bigScroll.setToolTip('Position in whole file')
+        box.addWidget(self.bigScroll)
+        lay.insertLayout(i, box)
+        self.bigScrollTimer = QTimer(self)
+        self.bigScrollTimer.setSingleShot(True)
+        self.bigScrollTimer.timeout.connect(self.bigScrollMoved)
+        self.bigScroll.valueChanged.connect(partial(self.bigScrollTimer.start, 30))
+        tb.verticalScrollBar().valueChanged.connect(self.bigScrolled)
+        self.bigfile.start()
+        self.showWindow(0)
+
+    def topLine(self):
+        # absolute line number at the top of the view, None if that isn't known yet
+        if self.winStart==None: return None
+        return self.winStart + self.textbody.cursorForPosition(QtCore.QPoint(0,0)).blockNumber()
+
+    def windowLines(self):
+        # lines of a big file in the document at once, too few and paging stalls
+        return max(100, typedQSettings().value('QTailWindowLines', 2000))
+
+    def showWindow(self, start, top=None):
+        # replace the document with the lines around start, keep line top at the top of the view
+        wl = self.windowLines()
+        start = max(0, min(start, self.bigfile.lines()-wl))
+        row = None
+        if top!=None and top>start: row = top-start
+        self.fillWindow(start, self.bigfile.text(start, wl), row)
+
+    def fillWindow(self, start, text, row=None):
+        # start is None when the index hasn't got this far (see showOffset)
+        self.winBusy = True
+        self.winStart = start
+        self.highlights.clear() # XX highlights don't survive moving the window
+        self.textbody.setPlainText(text)
+        if row:
+            doc = self.textbody.document()
+            block = doc.findBlockByNumber(row)
+            y = doc.documentLayout().blockBoundingRect(block).top()
+            self.textbody.verticalScrollBar().setValue(int(y))
+        self.winBusy = False
+        self.updateBigScroll()
+        self.showsize(False)
+
+    def updateBigScroll(self):
+        sb = self.bigScroll
+        sb.blockSignals(True)
+        sb.setRange(0, max(0, self.bigfile.lines()-1))
+        sb.setPageStep(max(1, self.textbody.cursorForPosition(QtCore.QPoint(0,self.textbody.viewport().height())).blockNumber() - self.textbody.cursorForPosition(QtCore.QPoint(0,0)).blockNumber()))
+        if self.winStart==None:
+            sb.setValue(sb.maximum())  # somewhere past what's indexed
+        else:
+            sb.setValue(self.topLine())
+        sb.blockSignals(False)
+
+    def bigScrollMoved(self):
+        top = self.bigScroll.value()
+        wl = self.windowLines()
+        self.showWindow(top - wl//2, top)
+
+    def bigScrolled(self, value):
+        # slide the window when the view gets near either edge
+        if self.winBusy or not self.bigfile: return
+        if self.winStart==None: return  # can't slide without line numbers
+        sb = self.textbody.verticalScrollBar()
+        wl = self.windowLines()
+        top = self.topLine()
+        if value <= sb.minimum()+sb.pageStep()//2 and self.winStart>0:
+            self.showWindow(top - wl//2, top)
+        elif value >= sb.maximum()-sb.pageStep()//2 and self.winStart+self.textbody.document().blockCount() < self.bigfile.lines():
+            self.showWindow(top - wl//2, top)
+        else:
+            self.updateBigScroll()
+
+    def bigProgress(self, lines):
+        wl = self.windowLines()
+        shown = self.textbody.document().blockCount()
+        if self.winStart==None:
+            if self.bigfile.indexed<self.winOffset:
+                self.updateBigScroll()
+                self.showsize(False)
+                return
+            # caught up with the window, now it has line numbers
+            self.winStart = self.bigfile.lineAt(self.winOffset)
+        if self.ui.followCheck.isChecked() and self.bigfile.complete():
+            self.bigEnd()
+        elif shown < wl and self.winStart+shown < lines:
+            # first window wasn't full yet
+            self.showWindow(self.winStart, self.topLine())
+        else:
+            self.updateBigScroll()
+        self.showsize(False)
+
+    def bigEnd(self):
+        wl = self.windowLines()
+        self.showWindow(self.bigfile.lines()-wl)
+        self.textbody.verticalScrollBar().setValue(self.textbody.verticalScrollBar().maximum())
+
+    ### go to a time or offset in a file on disk, and show the window there
+    def canSeek(self):
+        if self.bigfile: return True
+        if hasattr(self, 'filename') and not hasattr(self, 'filenames') and not self.opt.format \
+           and not self.opt.url and not self.ringview and os.path.isfile(self.filename):
+            return True
+        self.statusBar().showMessage('Only works on a plain text file')
+        return False
+
+    def enterBigFile(self):
+        # stop tailing and look at the whole file like --whole does
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
+        if self.file:
+            self.file.close()
+            self.file = None
+        # -n would trim the window, and then rows don't match lines
+        self.tailed = (self.opt.whole, self.opt.maxLines)
+        self.opt.whole = True
+        self.opt.maxLines = 0
+        self.textbody.document().setMaximumBlockCount(0)
+        self.ui.followCheck.setChecked(False)
+        self.openBigFile(self.filename)
+        if not hasattr(self, 'pollTimer'):
+            self.pollTimer = QTimer(self)
+            self.pollTimer.timeout.connect(partial(self.filechanged, self.filename))
+            self.pollTimer.start(int(self.pollInterval()*1000))
+
+    def leaveBigFile(self):
+        # closed, but left in place for the timers that don't know yet
+        self.bigfile.close() # stop indexing
+        if hasattr(self, 'tailed'):
+            # put back what enterBigFile changed
+            (self.opt.whole, self.opt.maxLines) = self.tailed
+            del self.tailed
+            self.textbody.document().setMaximumBlockCount(self.opt.maxLines)
+
+    def showOffset(self, offset):
+        if not self.bigfile: self.enterBigFile()
+        self.ui.followCheck.setChecked(False)
+        big = self.bigfile
+        wl = self.windowLines()
+        if offset<=big.indexed:
+            line = big.lineAt(offset)
+            self.showWindow(line - wl//2, line)
+            row = line-self.winStart
+        else:
+            # not indexed that far yet, go there anyway and count lines later
+            (start, text, row) = big.around(offset, wl//2, wl-wl//2)
+            self.winOffset = start
+            self.fillWindow(None, text, row)
+        # select the line
+        c = QTextCursor(self.textbody.document().findBlockByNumber(row))
+        c.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+        self.textbody.setTextCursor(c)
+
+    def goToOffset(self):
+        if not self.canSeek(): return
+        size = os.path.getsize(self.filename)
+        (text, ok) = QInputDialog.getText(self, 'Go to offset', 'Byte offset (k, M, G ok) or percent of {} bytes'.format(size))
+        if not ok: return
+        m = re.fullmatch(r'\s*(\d+(?:\.\d*)?)\s*([kmg%]?)\s*', text, re.I)
+        if not m:
+            self.statusBar().showMessage('Not an offset: '+text)
+            return
+        (n, unit) = (float(m.group(1)), m.group(2).lower())
+        if unit=='%':
+            offset = int(size*n/100)
+        else:
+            offset = int(n*{'':1, 'k':1024, 'm':1024**2, 'g':1024**3}[unit])
+        self.showOffset(min(offset, size))
+
+    def goToTime(self):
+        if not self.canSeek(): return
+        (text, ok) = QInputDialog.getText(self, 'Go to time', 'First line at or after this time\n(written like the file does, or a time of day)')
+        if not ok or not text.strip(): return
+        try:
+            parser = timestamps.timestampParser(self.getTimestampRegex())
+        except re.error as e:
+            self.statusBar().showMessage('Bad timestamp regex: {}'.format(e))
+            return
+        fd = os.open(self.filename, os.O_RDONLY)
+        try:
+            # a time of day needs a day, use the first one in the file
+            template = None
+            for (off, line) in linesFrom(fd, 0, 1024*1024):
+                template = parser.key(line.decode('utf-8', errors='replace'))
+                if template: break
+            target = parser.target(text, template)
+            if not target:
+                self.statusBar().showMessage('No time in "{}" like the file has'.format(text))
+                return
+            offset = timeOffset(fd, parser.key, target)
+            size = os.fstat(fd).st_size
         finally:
-            f.close()
-        self.setWindowTitle(filename)
-        self.ui.textBrowser.document().setMarkdown(text)
-        self.setButtonMode()
+            os.close(fd)
+        self.showOffset(offset)
+        if offset>=size:
+            self.statusBar().showMessage('Nothing at or after {}'.format(text))
+
+    def showStats(self):
+        if not self.stats:
+            self.stats = statsDock(self, self.textbody)
+            if self.ringview: self.stats.ring = self.ringview.ring
+            self.addDockWidget(Qt.RightDockWidgetArea, self.stats)
+        self.stats.show()
+        self.stats.raise_()
 
+    def goToLine(self):
+        if self.bigfile:
+            (line, ok) = QInputDialog.getInt(self, 'Go to line', 'Line number', (self.topLine() or 0)+1, 1, max(1,self.bigfile.lines()))
+            if not ok: return
+            wl = self.windowLines()
+            self.showWindow(line-1 - wl//2, line-1)
+        elif self.ringview:
+            view = self.ringview
+            (line, ok) = QInputDialog.getInt(self, 'Go to line', 'Line number', view.topLine()+1, 1, max(1, len(view.ring)))
+            if not ok: return
+            view.showLine(line-1)
+        else:
+            doc = self.textbody.document()
+            (line, ok) = QInputDialog.getInt(self, 'Go to line', 'Line number', self.textbody.textCursor().blockNumber()+1, 1, doc.blockCount())
+            if not ok: return
+            self.textbody.setTextCursor(QTextCursor(doc.findBlockByNumber(line-1)))
+    
     def openstdin(self):
         self.start()
+        self.noWrapWhole()
         self.setButtonMode()
         if not self.opt.title:
             self.setWindowTitle('qtail: stdin')
+        self.opt.file = False  #XXX sometimes this might be a file
+        if typedQSettings().value('QTailReaderThread', True):
+            self.file = None
+            self.startReader(os.dup(sys.stdin.fileno()))
+            return
         # QFile doesn't work with readyRead, use QSocketNotifier instead for pipes
         f = QtCore.QFile()
         self.file = f
@@ -648,8 +1268,21 @@ class QtTail(QtWidgets.QMainWindow):
         #if typedQSettings().value('DEBUG',False):print("stdin") # DEBUG
         #self.reload();  # socket notifier makes this redundant
         
+    def startReader(self, fd, offset=None, follow=False):
+        if self.reader:
+            self.reader.stop()
+        path = None
+        if follow and hasattr(self, 'filename'): path = self.filename
+        self.reader = readerThread(fd, offset, follow, path=path, parent=self)
+        self.reader.pollInterval = self.pollInterval()
+        self.reader.ready.connect(partial(self.readtext, 'reader'))
+        self.reader.eof.connect(partial(self.readtext, 'eof'))
+        self.reader.reopened.connect(self.fileReopened)
+        self.reader.start()
+
     def openProcess(self, title, process):
         self.start()
+        self.noWrapWhole()
         self.file = process
         if not self.opt.title:
             self.setWindowTitle(title)
@@ -694,7 +1327,19 @@ class QtTail(QtWidgets.QMainWindow):
     def openPretext(self, jobitem, textstream, pretext='', title=None):
         self.start()
         # textstream seems broken for non-blocking I/O
-        self.textbody.setPlainText(pretext)
+        if self.opt.format=='a':
+            self.textbody.clear()
+            self.sizer.add(self.insertAnsi(self.textbody.textCursor(), pretext))
+        elif self.opt.format in ('h', 'm'):
+            self.textbody.clear()
+            self.insertRich(self.textbody.textCursor(), pretext)
+        elif self.ringview:
+            self.ringview.clear()
+            self.ringview.appended(self.ringview.ring.append(pretext))
+            self.sizer.add(pretext)
+        else:
+            self.textbody.setPlainText(pretext)
+            self.sizer.add(pretext)
         # someone else already initialized stuff, just handing it over
         # pretend like we did it
         self.jobitem = jobitem # take ownership
@@ -733,8 +1378,113 @@ class QtTail(QtWidgets.QMainWindow):
         self.runcount += 1
         self.updateStatusIcon()
 
+    def applyRerun(self):
+        # replace only what changed since the last run
+        text = self.rerunText
+        self.rerunText = None
+        if text==None: return None
+        text.append(self.decoder.decode(bytes(self.file.readAll()), final=True))
+        text = ''.join(text)
+        if self.runShown!=None:
+            # looking at an old run, this one is in the history for later
+            return text
+        changed = self.showText(text)
+        self.statusBar().showMessage('{} lines, {} changes'.format(self.textbody.document().blockCount(), changed), -1)
+        return text
+
+    def showText(self, text):
+        # returns how many lines changed, None in the ring view (no diff there)
+        if self.ringview:
+            self.ringview.clear()
+            self.ringview.appended(self.ringview.ring.append(text), False)
+            return None
+        self.highlights.remove('changed')
+        changed = applyDiff(self.textbody.document(), text)
+        if changed and self.ui.actionHighlightChanges.isChecked():
+            self.highlights.add([ c[0] for c in changed ], [ c[1] for c in changed ], 'changed')
+        self.updateLiveSearches()
+        self.updateHighlightSet()
+        return len(changed)
+
+    ### history of watch runs
+    def recordRun(self, text=None):
+        if not (self.ui.actionWatch.isChecked() or self.ui.actionAutorefresh.isChecked()):
+            return
+        cap = typedQSettings().value('QTailWatchHistory', 4096)*1024
+        if cap<=0: return
+        if text==None:
+            if self.ringview:
+                ring = self.ringview.ring
+                text = '\n'.join(ring.lines(0, len(ring)))
+            else:
+                text = self.textbody.toPlainText()
+        self.runs.cap = cap
+        self.runs.add(text, self.exitcode)
+
+    def stepRun(self, step):
+        # show an older or newer run in place of the live output
+        n = len(self.runs)
+        if not n:
+            self.statusBar().showMessage('No past runs saved (turn on watch or autorefresh)')
+            return
+        if step==None:
+            i = n-1
+        elif self.runShown==None:
+            i = n-1+step
+        else:
+            i = self.runShown+step
+        i = max(0, min(n-1, i))
+        self.runShown = i if i<n-1 else None
+        changed = self.showText(self.runs.text(i))
+        msg = '{} of {}'.format(self.runs.describe(i), n)
+        if changed!=None: msg += ', {} changes'.format(changed)
+        if self.runShown==None: msg += ' (live)'
+        self.statusBar().showMessage(msg, -1)
+
+    def compareRuns(self):
+        n = len(self.runs)
+        if n<2:
+            self.statusBar().showMessage('Need at least two saved runs to compare')
+            return
+        names = [ self.runs.describe(i) for i in range(n) ]
+        cur = n-1 if self.runShown==None else self.runShown
+        (a, ok) = QInputDialog.getItem(self, 'Compare runs', 'Older run', names, max(0, cur-1), False)
+        if not ok: return
+        (b, ok) = QInputDialog.getItem(self, 'Compare runs', 'Newer run', names, cur, False)
+        if not ok: return
+        (a, b) = (names.index(a), names.index(b))
+        diff = difflib.unified_diff(self.runs.text(a).split('\n'), self.runs.text(b).split('\n'),
+                                    names[a], names[b], lineterm='')
+        # color it like git diff does
+        colors = { '+': '\x1b[32m', '-': '\x1b[31m', '@': '\x1b[36m' }
+        text = '\n'.join( colors.get(l[:1], '')+l+'\x1b[0m' for l in diff )
+        if not text: text = 'No differences'
+        opt = copy.copy(self.opt)
+        opt.format = 'a'
+        opt.maxLines = 0
+        if hasattr(opt, 'argparse'):
+            # just text, nothing to refresh, watch or search as it arrives
+            opt.argparse = copy.copy(opt.argparse)
+            for name in ('autorefresh', 'watch', 'findall', 'highlight', 'ring'):
+                setattr(opt.argparse, name, None)
+        w = QtTail(opt)
+        w.setWindowTitle('{}: {} vs {}'.format(self.windowTitle(), a+self.runs.dropped+1, b+self.runs.dropped+1))
+        w.start()
+        w.insertAnsi(w.textbody.textCursor(), text)
+        w.window_close_signal.connect(partial(self.runWindows.remove, w))
+        self.runWindows.append(w)
+        w.show()
+        w.actionAdjust()
+
+    def watchHighlightChanged(self, checked):
+        if not checked: self.highlights.remove('changed')
+
     def procFinished(self, exitcode, estatus):
         self.exitcode = exitcode
+        if self.rerunText==None:
+            # read the rest before it's saved as a run
+            while self.file.bytesAvailable()>0: self.readtext('finished')
+        self.recordRun(self.applyRerun())
         if self.firstRead: self.actionAdjust()
         self.setButtonMode()
         self.timestop = time.monotonic()
@@ -775,22 +1525,42 @@ class QtTail(QtWidgets.QMainWindow):
     
     @QtCore.pyqtSlot()
     def reload(self):
+        if self.bigfile:
+            self.bigfile.open()  # start over in case it was rewritten
+            self.bigfile.start()
+            self.showWindow(0)
+            return
+        if hasattr(self, 'filenames'):
+            try:
+                self.reloadMerged()
+            except OSError as e:
+                self.statusBar().showMessage('Reload failed on {}: {}'.format(e.filename, e.strerror))
+            return
         if not self.file and hasattr(self, 'filename'):
             # try to reopen it
-            self.textbody.clear()
+            self.clearText()
             return self.openfile(self.filename)
         if self.file and self.opt.file:
-            # back up 1M if we can (default)
-            tailoff = self.opt.tailFrag
-            # XXX whole is slow and eats memory if the file is too big!
-            if not self.opt.whole:
-                p = self.file.size()
-            if not self.opt.whole and p > tailoff:
-                self.file.seek(p-tailoff)
+            if self.opt.whole or self.opt.format=='m':
+                off = 0  # markdown makes no sense from the middle
+            elif self.opt.maxLines>0:
+                # find the start of the last maxLines lines from the end
+                cap = None
+                if self.opt.tailCap: cap = self.opt.tailFrag
+                try:
+                    off = tailOffset(self.file.handle(), self.opt.maxLines, cap)
+                except OSError:
+                    off = max(0, self.file.size()-self.opt.tailFrag)
             else:
-                # just go to the start
-                self.file.seek(0)
-            self.textbody.clear()
+                # no line limit, back up 1M (default)
+                off = max(0, self.file.size()-self.opt.tailFrag)
+            self.clearText()
+            if typedQSettings().value('QTailReaderThread', True):
+                # the reader gets its own copy of the file descriptor
+                self.startReader(os.dup(self.file.handle()), off, True)
+                return
+            self.file.seek(off)
+            self.decoder = newDecoder()
         else: # not a file, can't seek
             self.showsize()
         self.readtext('reload')
@@ -800,6 +1570,10 @@ class QtTail(QtWidgets.QMainWindow):
     @QtCore.pyqtSlot(bool)
     @QtCore.pyqtSlot(int)
     def wrapChanged(self, state):
+        if self.ringview:
+            # wraps lazily, cheap at any size
+            self.ringview.setWrap(state)
+            return
         e = self.textbody.textCursor()
         # current cursor might not be visible, so get one that is
         vc = self.textbody.cursorForPosition(QtCore.QPoint(10,10)) # not exactly at top, but close
@@ -833,45 +1607,31 @@ class QtTail(QtWidgets.QMainWindow):
     ### menu action slots
     @QtCore.pyqtSlot()
     def actionAdjust(self):
-        DEBUG= typedQSettings().value('DEBUG',False) # XXX
         doc = self.textbody.document()
-        docrect = doc.size() # QsizeF
         rect= self.size()
-        framedx = rect.width() - docrect.width()
-        framedy = rect.height() - docrect.height()
-        #print("ideal="+str(doc.idealWidth())+" width="+str(doc.textWidth())) # DEBUG
-        # time this expensive function and don't do it again if it's bad
-        # also disable it if --whole is used
-        if not self.disableAdjustSize and not self.opt.whole:
-            start = time.time()
-            doc.adjustSize()
-            interval = time.time()-start
-            blocks = doc.blockCount()
-            #print('adjustSize took {}s for {} blocks'.format(interval, blocks)) # DEBUG
-            if interval > 0.5 or blocks>100:  # SETTING time and maxline threshold for resize
-                # don't need to do this again if we have enough samples
-                # or if it took too long this time
-                self.disableAdjustSize=True
-                self.ui.actionAdjust.setEnabled(False)
-        #print(" ideal="+str(doc.idealWidth())+" width="+str(doc.textWidth())) # DEBUG
-        newsize = doc.size()
-        #print(' docsize='+str(newsize)) # DEBUG
-        lay = self.textbody.document().documentLayout()
-        #Abstract# print(' max='+str(lay.maximumWidth())+' min='+str(lay.minimumWidth())) # DEBUG
-        ## try to pick a decent size
-        height = docrect.height()
-        width = docrect.width()
-        #print(' docsize=%d,%d newsize=%d,%d'%(width,height,newsize.width(),newsize.height())) # DEBUG
-        if height > newsize.height(): # window shouldn't be bigger than doc
-            #if DEBUG: print(f"height doc: {height=} {newsize.height()=}")
-            height = newsize.height()
+        view = self.ringview or self.textbody
+        framedx = rect.width() - view.viewport().width()
+        # estimate from line lengths instead of laying out the whole document
+        if not self.sizer.count and not self.ringview: self.sizer.sample()
+        font = doc.defaultFont()
+        margin = doc.documentMargin()
+        width = self.sizer.width(font, margin)
+        # the first block is laid out already, so ask it how tall a line is
+        block = doc.firstBlock()
+        lines = block.layout().lineCount()
+        lineHeight = None
+        if lines and block.text():
+            lineHeight = doc.documentLayout().blockBoundingRect(block).height()/lines
+        if self.ringview:
+            height = self.sizer.height(font, len(self.ringview.ring), None, margin, self.ringview.lineHeight)
+        elif self.textbody.lineWrapMode()==QTextEdit.NoWrap:
+            height = self.sizer.height(font, doc.blockCount(), None, margin, lineHeight)
+        else:
+            height = self.sizer.height(font, doc.blockCount(), width, margin, lineHeight)
+        #print(' estimate=%d,%d'%(width,height)) # DEBUG
         extraw = typedQSettings().value('QTailExtraWidth',20.0)/100+1;
-        if width<newsize.width():  # rely on Qt to ignore rediculous resizes
-            width = newsize.width()*extraw # Qt underesitmates
-            #print('expand %d'%width) # DEBUG
-        elif width > newsize.width(): # shrink
-            width = newsize.width()*extraw
-        width += framedx
+        # rely on Qt to ignore rediculous resizes
+        width = width*extraw + framedx
         heightadjust = 100 # SETTING
         ## this was worse
         #if type(self.file)==QProcess and self.file.state()==QProcess.NotRunning:
@@ -898,65 +1658,59 @@ class QtTail(QtWidgets.QMainWindow):
         #print(' newsize='+str(width)+','+str(height)) # DEBUG
         self.resize(ceil(width), ceil(height))
 
-    def mergeSelections(self, selections):
-        es = sorted(self.textbody.extraSelections(), key=lambda x: x.cursor.position())
-        sel = sorted(selections, key=lambda x: x.cursor.position())
-        newsel = []
-        while es and sel:
-            ep = es[0].cursor.position()
-            sp = sel[0].cursor.position()
-            if ep<sp:
-                newsel.append(es.pop(0))
-            else:
-                newsel.append(sel.pop(0))
-            if ep==sp: # discard identical
-                es.pop(0)
-        if es:
-            newsel += es
-        if sel:
-            newsel += sel
-        self.textbody.setExtraSelections(newsel)
-            
-    def removeSelections(self, selections):
-        es = self.textbody.extraSelections()
-        for s in selections:
-            try:
-                i = next(i for i,v in enumerate(es) if v.cursor==s.cursor)
-                es.pop(i)
-            except StopIteration:
-                pass
-        self.textbody.setExtraSelections(es)
-            
-
-    def searchDock(self, title, selections, searchterm=None, findflags=None):
-        if not selections: return # don't make empty dock
-        dock = searchDock(self, title, selections, searchterm, findflags)
+    def searchDock(self, title, selections, searchterm=None, findflags=None, positions=None):
+        if not selections and not positions: return # don't make empty dock
+        dock = searchDock(self, title, selections, searchterm, findflags, positions)
+        if searchterm: dock.setMark(self.textbody.document())
         self.ui.actionShowClosedSearches.setVisible(True)
         self.ui.actionShowClosedSearches.setEnabled(True)
-        dock.showSel.connect(self.mergeSelections)
-        dock.hideSel.connect(self.removeSelections)
+        dock.showSel.connect(partial(self.showDockSel, dock))
+        dock.hideSel.connect(partial(self.highlights.remove, dock))
         dock.gotoSel.connect(self.textbody.setTextCursor) # XX make visible instead?
-        self.statusBar().showMessage("Found {} occurances of {}".format(len(selections), title), -1) # maybe dock should do this directly so it can be seen after start
+        self.statusBar().showMessage("Found {} occurances of {}".format(len(dock.model), title), -1) # maybe dock should do this directly so it can be seen after start
         self.want_resize.emit()
         return dock
 
+    def showDockSel(self, dock, starts, lens):
+        self.highlights.setFormat(dock, dock.color)
+        self.highlights.add(starts, lens, dock)
+
+    def updateLiveSearches(self):
+        doc = self.textbody.document()
+        for dock in self.findChildren(searchDock):
+            dock.scanNew(doc)
+
     def findSelection(self):
         cursor = self.textbody.textCursor()
-        # should this just get the current visible docks?
-        for dock in self.findChildren(QtWidgets.QDockWidget):
-            if hasattr(dock, 'findSelection'): # duck type
+        # docks with highlights showing only need to look if they own one here
+        owners = self.highlights.covering(cursor.position())
+        for dock in self.findChildren(searchDock):
+            if dock in owners or not dock.shown:
                 dock.findSelection(cursor)
-        
+
+    def nextHighlight(self, forward=True):
+        pos = self.textbody.textCursor().selectionStart()
+        if forward:
+            hit = self.highlights.next(pos)
+        else:
+            hit = self.highlights.prev(pos)
+        if hit:
+            self.textbody.setTextCursor(self.highlights.cursor(*hit))
+        else:
+            self.statusBar().showMessage('No more highlights')
+
     def extraSelectionsToDock(self):
+        if self.notInRing('Highlights'): return
+        positions = self.highlights.positions()
         if not self.highlightDock:
-            self.highlightDock = self.searchDock("Highlights", self.textbody.extraSelections())
+            self.highlightDock = self.searchDock("Highlights", None, positions=positions)
         else:
             self.highlightDock.show()
-            selections =self.textbody.extraSelections()
-            self.highlightDock.setSel(selections)
-            self.statusBar().showMessage("Found {} occurances of {}".format(len(selections), 'Highlights'), -1)
+            self.highlightDock.model.setPositions(*positions)
+            self.statusBar().showMessage("Found {} occurances of {}".format(len(positions[0]), 'Highlights'), -1)
         
     def findAll(self, text=None):
+        if self.notInRing('Find all'): return
         if not text:
             text = self.ui.searchTerm.text()
         if not text: return
@@ -968,32 +1722,165 @@ class QtTail(QtWidgets.QMainWindow):
         if self.ui.actionWholeWords.isChecked():
             findflags |= QTextDocument.FindWholeWords
 
-        finds = []
-        c = self.textbody.textCursor()
-        c.movePosition(QtGui.QTextCursor.Start)
-        doc = self.textbody.document() # use this instead of QTextEdit.find()
-        c = doc.find(searchterm, c, findflags)
-        prev=0
-        QtCore.QCoreApplication.processEvents()
-        while c and c.position()>=0:
-            es = QTextEdit.ExtraSelection() # make a blank entry
-            es.cursor = c       # save position, color it later
-            finds.append(es)
-            if not c.hasSelection(): # zero size match
-                # skip to next word, multiple hits in one word is dumb here
-                c.movePosition(QtGui.QTextCursor.NextWord,QtGui.QTextCursor.MoveAnchor, 1 )
-                if c.position()==prev:
-                    print('findall oops') # DEBUG EXCEPTION
-                    break # prevent infinite loop
-            prev = c.position()
-            c = doc.find(searchterm, c, findflags)
-            QtCore.QCoreApplication.processEvents()
-            #if typedQSettings().value('DEBUG',False): print(".",end='',flush=True)
-        if finds:
-            self.searchDock(text, finds, searchterm, findflags)
-        QtCore.QCoreApplication.processEvents() # for good luck
-        #if typedQSettings().value('DEBUG',False):print(len(finds))
- 
+        # search a snapshot in a thread, build the cursors as results arrive
+        self.cancelFindAll()
+        doc = self.textbody.document()
+        engine = searchThread(doc.toPlainText(), toRegex(searchterm, findflags), parent=self)
+        # remember where the snapshot ends, in case the top gets trimmed meanwhile
+        engine.mark = QTextCursor(doc)
+        engine.mark.movePosition(QTextCursor.End)
+        engine.mark.setKeepPositionOnInsert(True)
+        engine.markBlock = engine.mark.blockNumber()
+        engine.pos = []  # relative to the mark, which survives trimming
+        engine.len = []
+        engine.found.connect(partial(self.findAllBatch, engine))
+        engine.finished.connect(partial(self.findAllDone, engine, text, searchterm, findflags))
+        self.findThread = engine
+        self.statusBar().showMessage('Searching for {}'.format(text))
+        engine.start()
+
+    def findAllBatch(self, engine, hits):
+        if engine is not self.findThread: return # cancelled
+        doc = self.textbody.document()
+        shift = engine.markBlock - engine.mark.blockNumber()
+        end = engine.mark.position()
+        for (block, offset, length) in hits:
+            if block<shift: continue # trimmed off the top
+            b = doc.findBlockByNumber(block-shift)
+            if not b.isValid(): continue
+            engine.pos.append(b.position()+offset-end)
+            engine.len.append(length)
+
+    def findAllDone(self, engine, text, searchterm, findflags):
+        if engine is not self.findThread: return # cancelled
+        self.findThread = None
+        end = engine.mark.position()
+        pos = [ p+end for p in engine.pos ]
+        first = bisect_left(pos, 0)  # skip anything trimmed since
+        if first<len(pos):
+            dock = self.searchDock(text, None, searchterm, findflags, (pos[first:], engine.len[first:]))
+            # live search picks up where the snapshot ended
+            if dock: dock.setMark(self.textbody.document(), engine.mark)
+        else:
+            self.statusBar().showMessage('{} not found'.format(text))
+        engine.deleteLater()
+
+    def cancelFindAll(self):
+        engine = self.findThread
+        if engine:
+            self.findThread = None
+            engine.requestInterruption()
+            engine.wait()
+            engine.deleteLater()
+
+    def buildHighlightMenu(self, m):
+        m.clear()
+        names = highlightsets.listSets()
+        for name in names:
+            a = m.addAction(name, partial(self.applyHighlightSet, name))
+            a.setCheckable(True)
+            a.setChecked(bool(self.hlset) and self.hlset.name==name)
+        if names: m.addSeparator()
+        m.addAction('Save visible searches as set...', self.saveHighlightSet)
+        a = m.addAction('Clear highlight set', self.clearHighlightSet)
+        a.setEnabled(bool(self.hlset))
+        if names:
+            d = m.addMenu('Delete set')
+            for name in names:
+                d.addAction(name, partial(highlightsets.deleteSet, name))
+
+    def saveHighlightSet(self):
+        patterns = []
+        for dock in self.findChildren(searchDock):
+            if not dock.isVisible() or not dock.searchterm: continue
+            regex = toRegex(dock.searchterm, dock.findflags)
+            nocase = bool(regex.patternOptions() & regex.CaseInsensitiveOption)
+            patterns.append((regex.pattern(), dock.color.color().name(), nocase))
+        if not patterns:
+            self.statusBar().showMessage('No visible searches to save')
+            return
+        (name, ok) = QInputDialog.getText(self, 'Save highlight set', 'Name for {} patterns'.format(len(patterns)))
+        name = name.strip().replace('/','_')  # no subgroups
+        if not ok or not name: return
+        highlightsets.saveSet(highlightsets.highlightSet(name, patterns))
+        self.statusBar().showMessage('Saved highlight set '+name)
+
+    def applyHighlightSet(self, name):
+        if self.notInRing('Highlight sets'): return
+        hset = highlightsets.loadSet(name)
+        if not hset or not hset.isValid():
+            self.statusBar().showMessage('Bad or missing highlight set '+name)
+            return
+        self.clearHighlightSet()
+        self.hlset = hset
+        for (tag, fmt) in zip(hset.tags, hset.formats):
+            self.highlights.setFormat(tag, fmt)
+        # scan what we have in one pass for all patterns
+        doc = self.textbody.document()
+        engine = searchThread(doc.toPlainText(), hset.compiled, names=hset.names, parent=self)
+        hset.mark = QTextCursor(doc)
+        hset.mark.movePosition(QTextCursor.End)
+        hset.mark.setKeepPositionOnInsert(True)
+        engine.markBlock = hset.mark.blockNumber()
+        engine.found.connect(partial(self.highlightSetBatch, engine))
+        engine.finished.connect(partial(self.highlightSetDone, engine))
+        self.hlThread = engine
+        engine.start()
+
+    def highlightSetBatch(self, engine, hits):
+        if engine is not self.hlThread: return # cancelled
+        doc = self.textbody.document()
+        shift = engine.markBlock - self.hlset.mark.blockNumber()
+        starts = []
+        lens = []
+        tags = []
+        for (block, offset, length, group) in hits:
+            if block<shift or length==0: continue
+            b = doc.findBlockByNumber(block-shift)
+            if not b.isValid(): continue
+            starts.append(b.position()+offset)
+            lens.append(length)
+            tags.append(self.hlset.tags[group])
+        self.highlights.add(starts, lens, tags)
+
+    def highlightSetDone(self, engine):
+        if engine is not self.hlThread: return
+        self.hlThread = None
+        engine.deleteLater()
+        # catch up on anything that arrived during the scan
+        self.updateHighlightSet()
+        self.statusBar().showMessage('Highlight set {}: {} matches'.format(self.hlset.name, self.highlights.count(self.hlset.tags)))
+
+    def updateHighlightSet(self):
+        hset = self.hlset
+        if not hset or self.hlThread: return
+        # back up to the start of the line in case the last one was partial
+        c = QTextCursor(hset.mark)
+        c.movePosition(QTextCursor.StartOfBlock)
+        start = c.position()
+        c.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        hset.mark.movePosition(QTextCursor.End)
+        if not c.hasSelection(): return
+        hits = hset.scanText(c.selectedText().replace('\u2029', '\n'))
+        # the store drops the ones we already had from the partial line
+        self.highlights.add([ pos+start for (pos, length, group) in hits ],
+                            [ length for (pos, length, group) in hits ],
+                            [ hset.tags[group] for (pos, length, group) in hits ])
+
+    def clearHighlightSet(self):
+        self.cancelHighlightSet()
+        if self.hlset:
+            self.highlights.remove(self.hlset.tags)
+            self.hlset = None
+
+    def cancelHighlightSet(self):
+        engine = self.hlThread
+        if engine:
+            self.hlThread = None
+            engine.requestInterruption()
+            engine.wait()
+            engine.deleteLater()
+
 ##### end QtTail end
         
 if __name__ == '__main__':
@@ -1020,6 +1907,8 @@ if __name__ == '__main__':
         # open pipe
         # resize window with adjust() if command exits 
         pass
+    elif args and options.argparse.merge:
+        mainwin.openMerged(args)
     elif args and args[0]!='-':
         mainwin.openfile(args[0])
     else:
@@ -13,8 +13,11 @@ __copyright__ = '2022, 2023, 2024, Steven Dick <kg4ydw@gmail.com>'
 ## bugs:
 # XX Doesn't have its own icon (yet)
 
-import sys, os, io, csv, re, argparse
+import sys, os, io, csv, re, argparse, codecs, time
+from collections import deque
 from functools import partial
+from operator import itemgetter
+from itertools import chain, islice
 from math import ceil, floor
 from statistics import stdev, mean, median
 
@@ -26,15 +29,20 @@ from PyQt5.Qt import Qt, pyqtSignal
 
 from lib.betterio import betterQProcess, betterTextIOWrapper
 from lib.tableviewer_ui import Ui_TableViewer
-from lib.datamodels import simpleTable
+from lib.datamodels import columnTable
+from lib.columnstore import columnStore
+from lib.tableingest import ingestThread
 from lib.typedqsettings import typedQSettings
+from lib.statsdock import human
 from lib.buildsearch import buildSearch
 
 typedQSettings().registerOptions({
     'TableviewerResizeRows': [ False, 'Resize rows automatically to fit contents', bool],
     'TableviewerResizeRatio': [ 1.5, 'Max ratio of current size to larger size for automatic window resize if larger', float],
     'TableviewerPickerCols': [10,'Threshold of columns in table, over which the column picker is displayed by default', int],
-    'TableviewerBatchLines': [100, 'How many table rows to read at once', int]
+    'TableviewerBatchLines': [100, 'How many table rows to read at first, this grows or shrinks to fit TableviewerBatchTime', int],
+    'TableviewerBatchTime': [50, 'Milliseconds to spend adding rows before letting the window update', int],
+    'TableviewerMaxLine': [1024*1024, 'Lines longer than this many characters are broken up (0 for no limit)', int]
 
     })
 
@@ -49,74 +57,120 @@ typedQSettings().registerOptions({
 # * make sure there is always data available before __next__ is called
 # * instead of throwing away lines as we parse, maybe keep them all and reparse and rebuild the table when we've got more
 class lineBuffer():
-    lineEnds = '\n\r\x1d\x1e\x85\v\f\u2028\u2029'  # XX update this? from splitlines
+    lineEnds = '\n\r\x1c\x1d\x1e\x85\v\f\u2028\u2029'  # same as str.splitlines
+    blockSize = 65536
     def __init__(self, file):
         self.file = file
-        self.lines = []
+        self.lines = deque()  # whole lines, line ends and all
+        # the start of a line that hasn't ended yet, in pieces so a huge
+        # line isn't copied on every read
+        self.partial = []
+        self.partialLen = 0
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='backslashreplace')
+        self.maxLine = typedQSettings().value('TableviewerMaxLine', 1024*1024)
+        self.broken = False  # complained about a long line already
         self.eof = 0
+        self.consumed = 0  # characters (or bytes) read so far
         #  enable non-blocking I/O here?
         ## really only appropriate for stdin, and maybe file, so no
         # os.set_blocking(sys.stdin.fileno(),False)
-        
+
     ## replace strpeek with peeklines as often as possible
     def strpeek(self, size):  # XX not gonna fake size default
-        # horribly inefficent but meh, only call this once hopefully
-        s =  "".join(self.lines)
-        if len(s)<size:
+        if sum(map(len, self.lines))<size:
             self.canReadLine(True) # get some more
-            return "".join(self.lines)
+        text = []
+        n = 0
+        for line in self.lines:
+            text.append(line)
+            n += len(line)
+            if n>=size: return "".join(text)
+        return "".join(text+self.partial)
+
+    def split(self, text):
+        # only the new text is scanned for line ends
+        if not text: return
+        if self.partial and self.partial[-1][-1]=='\r':
+            # held back in case it was the first half of \r\n
+            if text[0]=='\n':
+                self.partial.append('\n')
+                text = text[1:]
+            self.endPartial()
+            if not text: return
+        lines = text.splitlines(keepends=True)
+        last = lines[-1]
+        if last[-1] in self.lineEnds and last[-1]!='\r':
+            last = None
         else:
-            return s
+            lines.pop()
+        if lines and self.partial:
+            self.partial.append(lines[0])
+            lines[0] = ''.join(self.partial)
+            self.partial = []
+            self.partialLen = 0
+        self.lines.extend(lines)
+        if last:
+            self.partial.append(last)
+            self.partialLen += len(last)
+            if self.maxLine and self.partialLen>=self.maxLine:
+                # break it rather than wait forever for the end
+                if not self.broken:
+                    print('lines longer than {} characters broken up'.format(self.maxLine)) # EXCEPT
+                    self.broken = True
+                self.partial.append('\n')
+                self.endPartial()
+
+    def endPartial(self):
+        self.lines.append(''.join(self.partial))
+        self.partial = []
+        self.partialLen = 0
 
     def handleEOF(self):
-        # got an eof, clean up any buffer left over
-        if len(self.lines)==1 and self.lines[0][-1] not in self.lineEnds:
+        # got an eof, the last line doesn't need a line end
+        # and half a character is all there will be
+        self.split(self.decoder.decode(b'', final=True))
+        if self.partial:
             #print('terminate at eof') # DEBUG
-            self.lines[0]+='\n'
+            if self.partial[-1][-1] not in self.lineEnds: self.partial.append('\n')
+            self.endPartial()
         return len(self.lines)>0 # use up what is left
+
     def canReadLine(self, readmore=False):
-        if not readmore: # force buffer growth for extended peeking
-            if len(self.lines)>1: return True
-            if len(self.lines)>0 and self.lines[0][-1] in self.lineEnds: return True
+        if not readmore and self.lines: # force buffer growth for extended peeking
+            return True
         # read until we get a whole line or run out
-        # XX should this abort for insanely long lines? how long is that?
-        lines=[]
-        buf = ''
-        while len(lines)<1 or len(lines[0])<1 or lines[0][-1] not in self.lineEnds:
-            buffer = self.file.read(1024)
-            if buffer==None or len(buffer)==0: break
-            if type(buffer)==str:
-                buf += buffer
-            else:
-                buf += buffer.decode('utf-8', errors='backslashreplace')
-            lines = buf.splitlines(keepends=True)
-        if len(buf)>0:
+        got = False
+        have = len(self.lines)
+        while True:
+            buffer = self.file.read(self.blockSize)
+            if buffer==None or len(buffer)==0:
+                break  # maybe just nothing yet, see below
+            got = True
+            self.consumed += len(buffer)
+            if type(buffer)!=str:
+                buffer = self.decoder.decode(buffer)
+            self.split(buffer)
+            if len(self.lines)>have: break
+        if got:
             self.eof = 0  # we got some data
-        # save what we read before doing something about EOF
-        if len(lines)>0 and len(self.lines)>0 and self.lines[-1][-1] not in self.lineEnds:
-            # append to end of previous line
-            self.lines[-1] += lines.pop(0)
-        # save any remaining whole lines
-        if len(lines)>0:
-            self.lines += lines
         # deal with EOF, including using last partial line
         if buffer==None:
             self.eof = 6
             return self.handleEOF()
         elif len(buffer)==0:
-            self.eof +=1
+            state = getattr(self.file, 'state', None)
+            if state and state()==QProcess.NotRunning:
+                self.eof = 6  # that's really all
+                return self.handleEOF()
+            if not state: self.eof +=1  # a running process is just slow
             if self.eof>2:
                 return self.handleEOF() # failed 3x, maybe done?
-        # if not eof, did we get a whole line
-        if len(self.lines)==0: return False
-        if len(self.lines)>1 or (len(self.lines[0])>0 and self.lines[0][-1] in self.lineEnds):
-                return True
-        return False
+        return len(self.lines)>0
 
     def peekLines(self, minimum=1 ):
         if minimum==0 or len(self.lines)<minimum:
                 self.canReadLine(True) # attempt to read more
-        return self.lines  # just let 'em see them all
+        return self.lines  # just let 'em see them all (whole ones)
     def peekAll(self):
         # turn off nonblocking
         try:
@@ -127,14 +181,21 @@ class lineBuffer():
         self.peekLines(False)
         if self.eof<2: return None
         else: return self.lines
+    def takeAll(self):
+        # hand over the buffer and the partial line, now someone else reads the file
+        lines = self.lines
+        if self.partial: lines.append(''.join(self.partial))
+        self.lines = deque()
+        self.partial = []
+        self.partialLen = 0
+        return lines
     def __iter__(self):
         return self
     def __next__(self):
-        # should this make sure the next line is whole
-        # or assume the calling code already called canReadLine
-        if len(self.lines)==0:
+        # assume the calling code already called canReadLine
+        if not self.lines:
             raise StopIteration
-        return self.lines.pop(0)
+        return self.lines.popleft()
 
             
 ## ideas to implement and/or document
@@ -149,7 +210,13 @@ class lineBuffer():
 
 
 # this relies on features from lineBuffer to correctly pace I/O
+# Columns are cut with a plan made once from the offsets: an itemgetter of
+# slices does the whole row in C.  parseBlock() does a list of lines and
+# skips tab expansion when there are no tabs; readmore hands it whatever
+# lineBuffer has, and once readFrom() hands over the rest of a file the
+# iterator takes blocks too.  Otherwise it takes one line per row asked for.
 class FixedWidthParser():
+    blockSize = 1000
     def __init__(self, f, options={}):
         # optimistically do this without peek for now
         # this doesn't handle right justified or centered columns but mask does
@@ -178,25 +245,43 @@ class FixedWidthParser():
                     if i<len(s):
                         col.append(i-(gapthresh-1)) # back up one, put border in the column
         self.col = col
+        slices = [ slice(a, b) for (a, b) in zip(col, col[1:]) ] + [ slice(col[-1], None) ]
+        if len(slices)>1:
+            self.extract = itemgetter(*slices)
+        else:  # itemgetter wouldn't return a tuple
+            self.extract = lambda s: (s[slices[0]],)
+        self.source = f  # paced by this lineBuffer
         self.lines = iter(f)
         # column offsets are now available by clipboard in the view menu
         #print("col = "+(",".join([str(i) for i in col]))) # DEBUG
     
     def __len__(self):
         return len(self.col)
+    def readFrom(self, lines):
+        # someone else reads the file now, no need to pace
+        self.lines = lines
+        self.source = None
+    def parseBlock(self, lines):
+        '''Rows for a list of lines'''
+        if '\t' in ''.join(lines):
+            lines = [ s.expandtabs() for s in lines ]
+        extract = self.extract
+        strip = str.strip
+        return [ list(map(strip, extract(s))) for s in lines ]
     def __iter__(self):
         while True:
             try:
                 s = next(self.lines)
-                if s!=None:
-                    s=s.expandtabs()
-                else:
+                if s==None:
                     yield None  # not end of file
                     continue
+                block = [s]
+                if not self.source:
+                    block += islice(self.lines, self.blockSize-1)
             except StopIteration:
                 if typedQSettings().value('Debug',False): print('fixed got stop') # DEBUG
                 return
-            yield [ s[self.col[i]:self.col[i+1]].strip() for i in range(len(self.col)-1) ] + [  s[self.col[-1]:].strip() ]
+            yield from self.parseBlock(block)
 
 # this is so small, just copy it rather than import
 class softArgumentParser(argparse.ArgumentParser):
@@ -225,6 +310,10 @@ class TableViewer(QtWidgets.QMainWindow):
         self.argdict = {}
         self.headers = None
         self.forcefixed=False
+        self.ingest = None  # parser thread for regular files
+        self.batch = int(typedQSettings().value('TableviewerBatchLines',100))
+        self.loadStart = time.monotonic()
+        self.lastProgress = 0
         # connect to my own event so I can send myself a delayed signal
         self.want_resize.connect(self.actionAdjust, Qt.QueuedConnection)
         self.ui = Ui_TableViewer()
@@ -363,7 +452,7 @@ class TableViewer(QtWidgets.QMainWindow):
         if checked:
             self.model.headers = [str(col+1) for col in range(len(self.model.headers))]
         else: # recopy first row
-            self.model.headers = self.model.mydata[0]
+            self.model.headers = self.model.mydata.row(0)
         self.model.headerDataChanged.emit(Qt.Horizontal, 0, len(self.model.headers))
 
     def squeezeColumns(self):
@@ -426,6 +515,7 @@ class TableViewer(QtWidgets.QMainWindow):
         sm.selectionChanged.connect(self.tableSelect)
 
     def closeEvent(self,event):
+        if self.ingest: self.ingest.stop()
         self.window_close_signal.emit()
         super().closeEvent(event)
 
@@ -537,7 +627,7 @@ class TableViewer(QtWidgets.QMainWindow):
         if len(title)>30: title=os.path.basename(title)
         self.setWindowTitle(title)
         try:
-            self.csvfile = lineBuffer(open(filename, errors='backslashreplace'))
+            self.csvfile = lineBuffer(open(filename, errors='backslashreplace', buffering=1024*1024))
         except OSError as e:
             self.error = e.strerror
             err = 'Open failed on {}: {}'.format(filename,e.strerror)
@@ -547,8 +637,80 @@ class TableViewer(QtWidgets.QMainWindow):
             self.setParent(None)  # delete later?
             raise
         self.openfd(self.csvfile)
+        if not self.firstread and os.path.isfile(filename):
+            self.startIngest()
         self.want_readmore.emit('initial') # extra just in case
 
+    def startIngest(self):
+        # the format is known, parse the rest of the file in a thread
+        lines = self.csvfile.takeAll()
+        f = self.csvfile.file
+        if lines and lines[-1][-1] not in lineBuffer.lineEnds:
+            lines[-1] += f.readline()  # finish the partial line
+        lines = chain(lines, f)
+        fixed = hasattr(self, 'parser')
+        if fixed:
+            self.parser.readFrom(lines)  # the parser's iterator reads from this
+            rows = self.csvreader
+        else:
+            rows = csv.reader(lines, self.csvreader.dialect)
+        self.ingest = ingestThread(rows, strip=not fixed, parent=self)
+        self.ingest.ready.connect(partial(self.readmore, 'ingest'))
+        self.ingest.eof.connect(partial(self.readmore, 'ingest eof'))
+        self.ingest.start()
+
+    def takeRows(self):
+        # as many batches as fit in one pass, so the window stays responsive
+        start = time.monotonic()
+        rows = []
+        while len(rows)<self.batch:
+            batch = self.ingest.take()
+            if not batch: break
+            rows += batch
+        if rows:
+            self.model.insertRowsAt(1, rows)
+            self.adjustBatch(start, len(rows)>=self.batch)
+        if self.ingest.pending():
+            self.want_readmore.emit('more ingest')
+        self.showProgress(self.ingest.done and not self.ingest.pending())
+
+    def adjustBatch(self, start, full):
+        # aim for TableviewerBatchTime per pass: grow while rows are cheap,
+        # shrink when the view (sorting, filtering) makes inserts slow
+        budget = typedQSettings().value('TableviewerBatchTime', 50)/1000
+        elapsed = time.monotonic()-start
+        if elapsed>budget:
+            self.batch = max(10, int(self.batch*budget/elapsed))
+        elif full and elapsed<budget/2:
+            self.batch = min(self.batch*2, 1000000)
+
+    def bytesRead(self):
+        # regular files are read by the ingest thread, ask the OS how far it got
+        if self.ingest:
+            try:
+                fd = self.csvfile.file.fileno()
+                return (os.lseek(fd, 0, os.SEEK_CUR), os.fstat(fd).st_size)
+            except (OSError, ValueError):  # closed
+                return (0, 0)
+        return (self.csvfile.consumed, 0)
+
+    def showProgress(self, done=False):
+        # twice a second is plenty, and once more when caught up
+        now = time.monotonic()
+        if not done and now-self.lastProgress<0.5: return
+        self.lastProgress = now
+        if not hasattr(self, 'model'): return  # nothing read yet
+        elapsed = max(now-self.loadStart, 0.001)
+        rows = self.model.rowCount(None)
+        (pos, size) = self.bytesRead()
+        msg = '{} rows, {} read'.format(rows, human(pos))
+        if size and not done: msg += ' ({:1.0f}%)'.format(pos*100/size)
+        if done:
+            msg += ' in {:1.1f}s'.format(elapsed)
+        else:
+            msg += ', {:1.0f} rows/s'.format(rows/elapsed)
+        self.statusBar().showMessage(msg)
+
     def openProcess(self, title, process):
         self.process = process
         self.csvfile = lineBuffer(process)
@@ -557,6 +719,7 @@ class TableViewer(QtWidgets.QMainWindow):
         else:
             self.setWindowTitle('tableviewer window') # SETTING
         process.readyRead.connect(partial(self.readmore,'readyread'))
+        process.finished.connect(partial(self.readmore,'finished')) # for the last line
         #XX Note that QProcess might not even be started yet
         ## qtail does the following, should these buttons be ported here?
         # self.rebutton('kill', self.terminateProcess) XXX
@@ -699,7 +862,7 @@ class TableViewer(QtWidgets.QMainWindow):
         except:
             pass
         self.headers = headers  # too many copies of this? confusing.
-        self.model = simpleTable(self.data, headers)
+        self.model = columnTable(columnStore(self.data), headers)
         self.model.checkExtendHeaders(maxx)
         self.proxymodel = QtCore.QSortFilterProxyModel()
         cb = self.ui.tableView.findChild(QtWidgets.QAbstractButton)
@@ -739,8 +902,12 @@ class TableViewer(QtWidgets.QMainWindow):
      
     def readmore(self,fromwhere):
         DEBUG = typedQSettings().value('DEBUG',False)
+        if self.ingest:
+            self.takeRows()
+            return
         if not self.csvfile.canReadLine():
             # why did you bother us, you're not ready yet
+            if self.csvfile.eof>2: self.showProgress(True)
             return
         if self.firstread:  # didn't have any data at start, try again now
             #if DEBUG: print('first read') # DEBUG
@@ -749,7 +916,14 @@ class TableViewer(QtWidgets.QMainWindow):
         #if DEBUG: print('readmore '+fromwhere)  # DEBUG
         row=None
         # don't read too many lines at once (prevent lockup from large data)
-        lines = int(typedQSettings().value('TableviewerBatchLines',100))
+        start = time.monotonic()
+        lines = self.batch
+        if hasattr(self, 'parser'):
+            # the lines already buffered, a block at a time
+            while lines>0 and self.csvfile.canReadLine():
+                block = list(islice(self.csvfile, min(lines, len(self.csvfile.lines))))
+                rows += self.parser.parseBlock(block)
+                lines -= len(block)
         while lines>0 and self.csvfile.canReadLine():
             row = next(self.csvreader)
             row = [ cell.strip() for cell in row]
@@ -759,7 +933,9 @@ class TableViewer(QtWidgets.QMainWindow):
             self.want_readmore.emit('more more') # get more on next pass
         if rows:
             #if DEBUG: print("Read {} rows".format(len(rows))) # DEBUG
-            self.model.insertRowsAt(1,rows)
+            self.model.insertRowsAt(1,rows)  # one insert per pass
+        self.adjustBatch(start, lines<=0)
+        self.showProgress(lines>0)  # caught up, show where we are
 
     def hideCols(self):
         indexes = self.ui.colPicker.selectedIndexes()
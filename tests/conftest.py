@@ -0,0 +1,11 @@
+import os, sys
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PyQt5.QtWidgets import QApplication
+
+@pytest.fixture(scope='session')
+def app():
+    return QApplication.instance() or QApplication([])
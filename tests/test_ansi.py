@@ -0,0 +1,31 @@
+from PyQt5.QtGui import QTextDocument, QTextCursor
+
+from lib.ansi import ansiParser
+
+def render(*reads):
+    doc = QTextDocument()
+    cursor = QTextCursor(doc)
+    parser = ansiParser()
+    plain = ''.join( parser.insert(cursor, text) for text in reads )
+    return (plain, doc.toPlainText(), parser)
+
+def test_colors(app):
+    (plain, text, parser) = render('a\x1b[31mred\x1b[0m b')
+    assert plain == text == 'ared b'
+    assert parser.fg is None
+
+def test_split_escape(app):
+    (plain, text, parser) = render('a\x1b[3', '1mred')
+    assert text == 'ared'
+    assert parser.fg is not None
+
+def test_lone_esc_before_escape(app):
+    assert render('a\x1b\x1bb')[1] == 'ab'
+    assert render('a\x1b', '\x1bb')[1] == 'ab'
+    assert render('a\x1b\x1b', 'b')[1] == 'ab'
+    (plain, text, parser) = render('a\x1b\x1b[31mred')
+    assert text == 'ared'
+    assert parser.fg is not None
+
+def test_osc_dropped(app):
+    assert render('\x1b]0;title\x07x', '\x1b]0;t\x1b', '\\y')[1] == 'xy'
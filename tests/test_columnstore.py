@@ -0,0 +1,23 @@
+from lib.columnstore import columnStore
+
+def test_short_tuples():
+    st = columnStore([['a', 'b', 'c'], ('1',), ('2', '3')])
+    assert st.row(1) == ['1', '', '']
+    assert st.row(2) == ['2', '3', '']
+
+def test_prepend():
+    st = columnStore([['1', 'x'], ['2', 'y']])
+    st.setCell(1, 1, 'edited')
+    st.prepend([('id', 'name', 'extra')])
+    assert len(st) == 3
+    assert [ st.row(i) for i in range(3) ] == [['id', 'name', 'extra'], ['1', 'x', ''], ['2', 'edited', '']]
+    st.extend([['3', 'z']])
+    assert st.row(3) == ['3', 'z', '']
+
+def test_model_prepend():
+    from lib.datamodels import columnTable
+    model = columnTable(columnStore([['1', 'x']]), ['n', 'v'])
+    model.insertRowsAt(0, [['0', 'w']])
+    model.insertRowsAt(1, [['2', 'y']])
+    assert [ model.mydata.row(i) for i in range(3) ] == [['0', 'w'], ['1', 'x'], ['2', 'y']]
+    assert model.rowCount(None) == 3
@@ -0,0 +1,42 @@
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QTextEdit
+
+from lib.highlightstore import highlightStore
+
+def setup(text, spans):
+    te = QTextEdit()
+    te.setPlainText(text)
+    store = highlightStore(te)
+    for (start, length) in spans:
+        store.insert(start, length, 'find')
+    return (te, store)
+
+def replace(te, start, end, text):
+    c = QTextCursor(te.document())
+    c.setPosition(start)
+    c.setPosition(end, QTextCursor.KeepAnchor)
+    c.insertText(text)
+
+def marked(te, store):
+    text = te.toPlainText()
+    return [ text[s:s+n] for (s, n) in zip(*store.positions()) ]
+
+def test_same_length_replace_under(app):
+    # watchdiff style edit: same length, over the highlight
+    (te, store) = setup('one two three four', [(4, 3), (14, 4)])
+    replace(te, 4, 7, 'TWO')
+    assert marked(te, store) == ['four']
+
+def test_replace_across(app):
+    # starts before the edit and runs into it: clipped
+    (te, store) = setup('alpha beta gamma', [(0, 8), (11, 5)])
+    replace(te, 6, 10, 'BETA')
+    assert store.positions() == ([0, 11], [6, 5])
+    assert marked(te, store) == ['alpha ', 'gamma']
+
+def test_replace_shifts_later(app):
+    (te, store) = setup('alpha beta gamma', [(0, 5), (11, 5)])
+    replace(te, 6, 10, 'b')
+    assert marked(te, store) == ['alpha', 'gamma']
+    replace(te, 0, 0, '>> ')
+    assert marked(te, store) == ['alpha', 'gamma']
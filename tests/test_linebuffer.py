@@ -0,0 +1,27 @@
+from PyQt5.QtCore import QProcess
+
+from tableviewer import lineBuffer
+
+class chunks():
+    # reads like a QProcess that is running until the chunks run out
+    def __init__(self, parts):
+        self.parts = list(parts)
+    def read(self, size):
+        return self.parts.pop(0) if self.parts else b''
+    def state(self):
+        return QProcess.Running if self.parts else QProcess.NotRunning
+
+def readAll(buf, tries=10):
+    lines = []
+    for i in range(tries):
+        if buf.canReadLine(): lines.extend(buf)
+    return lines
+
+def test_split_character(app):
+    # an empty read from a running process is not the end
+    buf = lineBuffer(chunks([b'a,\xc3', b'', b'\xa9\n']))
+    assert readAll(buf) == ['a,\xe9\n']
+
+def test_crlf_and_last_line(app):
+    buf = lineBuffer(chunks([b'ab\r', b'\ncd', b'\r', b'ef']))
+    assert readAll(buf) == ['ab\r\n', 'cd\r', 'ef\n']
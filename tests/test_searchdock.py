@@ -0,0 +1,35 @@
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QTextEdit
+
+from lib.searchdock import selList
+
+def setup(text, spans):
+    te = QTextEdit()
+    te.setPlainText(text)
+    doc = te.document()
+    model = selList(doc)
+    model.setPositions([ s for (s, n) in spans ], [ n for (s, n) in spans ])
+    return (te, doc, model)
+
+def replace(doc, start, end, text):
+    c = QTextCursor(doc)
+    c.setPosition(start)
+    c.setPosition(end, QTextCursor.KeepAnchor)
+    c.insertText(text)
+
+def hits(model):
+    return [ model.item(row).text for row in range(len(model)) ]
+
+def test_same_length_replace(app):
+    (te, doc, model) = setup('one two three four', [(4, 3), (14, 4)])
+    assert hits(model) == ['two', 'four']
+    replace(doc, 4, 7, 'TWO')
+    assert hits(model) == ['four']
+
+def test_replace_across(app):
+    (te, doc, model) = setup('alpha beta gamma', [(0, 8), (11, 5)])
+    assert hits(model) == ['alpha be', 'gamma']
+    replace(doc, 6, 10, 'BETA')
+    assert hits(model) == ['alpha ', 'gamma']
+    replace(doc, 6, 10, 'b')
+    assert hits(model) == ['alpha ', 'gamma']